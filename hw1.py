@@ -1,3 +1,12 @@
+# imports {{{1
+from itertools import compress, izip
+from multiprocessing import Pool, cpu_count
+import mmap
+import struct
+import time
+import zlib
+#---------------------------------------------------------------------------}}}1
+
 def S(N):
 	A = []
 	for n in range(2, N + 1):
@@ -10,5 +19,343 @@ def S(N):
 		if do_add_n:
 			A.append(n)
 	return A
-	
-print ('the solution is ' + str(S(100)))
\ No newline at end of file
+
+# Segmented sieve {{{1
+# S(N) does trial division, which is hopeless past a few hundred thousand. The
+# functions below run a segmented Sieve of Eratosthenes instead. Only odd
+# numbers are stored: a window is a bytearray seg where seg[i] is 1 iff
+# base + 2*i is prime. Each window covers SEGMENT_SIZE odd numbers, so memory
+# is bounded by the window (plus the base primes up to sqrt(N)), not by N.
+
+SEGMENT_SIZE = 2**15
+
+def _isqrt(n): # {{{
+	# floor(sqrt(n)), exact for large n
+	if n < 2:
+		return max(n, 0)
+	x = int(n**0.5)
+	while x*x > n:
+		x -= 1
+	while (x+1)*(x+1) <= n:
+		x += 1
+	return x
+#----------------------------------------------------------------------------}}}
+def _base_primes(N): # {{{
+	# Plain odd-only sieve, used for the primes up to sqrt(N). Returns the list
+	# of primes <= N.
+	if N < 2:
+		return []
+	size = (N + 1)//2          # index i stands for 2*i + 1
+	sieve = bytearray([1])*size
+	sieve[0] = 0
+	for i in range(1, (_isqrt(N) - 1)//2 + 1):
+		if sieve[i]:
+			p = 2*i + 1
+			start = p*p//2
+			sieve[start::p] = bytearray((size - 1 - start)//p + 1)
+	return [2] + list(compress(xrange(1, 2*size, 2), sieve))
+#----------------------------------------------------------------------------}}}
+def sieve_segments(lo, hi, segment_size = SEGMENT_SIZE, base_primes = None): # {{{
+	# Yield pairs (base, seg) covering the odd numbers in [lo, hi]; seg[i] is 1
+	# iff base + 2*i is prime. The prime 2 is never reported here. base_primes,
+	# if given, must hold the odd primes up to at least sqrt(hi).
+	lo = max(lo, 1) | 1
+	if hi < lo:
+		return
+	if base_primes is None:
+		base_primes = _base_primes(_isqrt(hi))[1:]
+	for seg_lo in xrange(lo, hi + 1, 2*segment_size):
+		seg_hi = min(seg_lo + 2*(segment_size - 1), hi)
+		n = (seg_hi - seg_lo)//2 + 1
+		seg = bytearray([1])*n
+		for p in base_primes:
+			start = p*p
+			if start > seg_hi:
+				break
+			if start < seg_lo:
+				start = ((seg_lo + p - 1)//p)*p
+				if start % 2 == 0:
+					start += p
+			i = (start - seg_lo)//2
+			if i < n:
+				seg[i::p] = bytearray((n - 1 - i)//p + 1)
+		if seg_lo == 1:
+			seg[0] = 0
+		yield seg_lo, seg
+#----------------------------------------------------------------------------}}}
+def primes_between(lo, hi, segment_size = SEGMENT_SIZE): # {{{
+	# Generator of the primes p with lo <= p <= hi, in increasing order.
+	if lo <= 2 <= hi:
+		yield 2
+	for base, seg in sieve_segments(max(lo, 3), hi, segment_size):
+		for p in compress(xrange(base, base + 2*len(seg), 2), seg):
+			yield p
+#----------------------------------------------------------------------------}}}
+def primes(N, segment_size = SEGMENT_SIZE): # {{{
+	# Streaming version of S(N): generates the primes <= N.
+	return primes_between(2, N, segment_size)
+#----------------------------------------------------------------------------}}}
+def prime_count(N, lo = 2, segment_size = SEGMENT_SIZE): # {{{
+	# Count the primes in [lo, N] without generating them.
+	count = 1 if lo <= 2 <= N else 0
+	for _, seg in sieve_segments(max(lo, 3), N, segment_size):
+		count += seg.count(b'\x01')
+	return count
+#----------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+# Parallel sieve {{{1
+# The range is cut into chunks of CHUNK_SIZE odd numbers. Every worker gets the
+# odd base primes up to sqrt(N) once, through the pool initializer, and sieves
+# whole chunks with sieve_segments, so each chunk still goes through
+# cache-sized windows. Pool.imap hands the chunks back in order.
+
+CHUNK_SIZE = 2**20     # a multiple of 8, so packed chunks line up on bytes
+
+_worker_base_primes = None
+
+def pack_bits(seg): # {{{
+	# Pack a bytearray of 0/1 flags into a bitmap: flag i goes to bit i % 8 of
+	# byte i // 8. The tail is padded with zeros.
+	seg = seg + bytearray(-len(seg) % 8)
+	return bytearray(a | b << 1 | c << 2 | d << 3 | e << 4 | f << 5 | g << 6 | h << 7
+		for a, b, c, d, e, f, g, h in izip(*[seg[k::8] for k in range(8)]))
+#----------------------------------------------------------------------------}}}
+def _init_worker(base_primes): # {{{
+	global _worker_base_primes
+	_worker_base_primes = base_primes
+#----------------------------------------------------------------------------}}}
+def _sieve_chunk(job): # {{{
+	# Runs in a worker. job = (mode, lo, hi) with lo odd.
+	mode, lo, hi = job
+	segs = sieve_segments(lo, hi, SEGMENT_SIZE, _worker_base_primes)
+	if mode == 'count':
+		return sum(seg.count(b'\x01') for _, seg in segs)
+	flags = bytearray()
+	for _, seg in segs:
+		flags += seg
+	if mode == 'bitmap':
+		return pack_bits(flags)
+	return flags
+#----------------------------------------------------------------------------}}}
+def _parallel_chunks(mode, N, processes, chunk_size): # {{{
+	# Generate the worker results for the odd numbers in [1, N], in order.
+	if chunk_size % 8 != 0:
+		raise ValueError("chunk_size must be a multiple of 8")
+	jobs = ( (mode, lo, min(lo + 2*(chunk_size - 1), N))
+		for lo in xrange(1, N + 1, 2*chunk_size) )
+	pool = Pool(processes, _init_worker, (_base_primes(_isqrt(N))[1:],))
+	try:
+		for result in pool.imap(_sieve_chunk, jobs):
+			yield result
+		pool.close()
+	finally:
+		pool.terminate()
+		pool.join()
+#----------------------------------------------------------------------------}}}
+def parallel_primes(N, processes = None, chunk_size = CHUNK_SIZE): # {{{
+	# Same stream as primes(N), with the sieving spread over a process pool.
+	if N >= 2:
+		yield 2
+	base = 1
+	for flags in _parallel_chunks('primes', N, processes, chunk_size):
+		for p in compress(xrange(base, base + 2*len(flags), 2), flags):
+			yield p
+		base += 2*len(flags)
+#----------------------------------------------------------------------------}}}
+def parallel_prime_count(N, processes = None, chunk_size = CHUNK_SIZE): # {{{
+	count = 1 if N >= 2 else 0
+	return count + sum(_parallel_chunks('count', N, processes, chunk_size))
+#----------------------------------------------------------------------------}}}
+def parallel_bitmap(N, processes = None, chunk_size = CHUNK_SIZE): # {{{
+	# Return the odd-only bitmap of [1, N] as packed by pack_bits: bit i is set
+	# iff 2*i + 1 is prime. The prime 2 is implicit.
+	bitmap = bytearray()
+	for packed in _parallel_chunks('bitmap', N, processes, chunk_size):
+		bitmap += packed
+	return bitmap
+#----------------------------------------------------------------------------}}}
+def bench_parallel(N = 10**8, max_processes = None): # {{{
+	# Time parallel_prime_count(N) with 1, 2, ..., max_processes workers.
+	if max_processes is None:
+		max_processes = cpu_count()
+	base_time = None
+	for processes in range(1, max_processes + 1):
+		start = time.time()
+		count = parallel_prime_count(N, processes)
+		elapsed = time.time() - start
+		if base_time is None:
+			base_time = elapsed
+		print ('%2d processes: pi(%d) = %d in %.2fs (speedup %.2fx)'
+			% (processes, N, count, elapsed, base_time / elapsed))
+#----------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+# Prime table file {{{1
+# A prime table is the packed odd-only bitmap of [1, N] on disk (bit i is set
+# iff 2*i + 1 is prime), laid out as
+#
+#   header | bitmap | index
+#
+# The header holds a magic string, N, the bitmap length in bytes, the block
+# size in bytes and the CRC32 of the bitmap. The index has one little-endian
+# uint64 per block of the bitmap, the number of odd primes before that block,
+# followed by the total. PrimeTable opens the file with mmap, so processes
+# that open the same table share one page-cached copy, and all queries read
+# the file in place.
+
+_TABLE_MAGIC = b'PRIMTBL1'
+_TABLE_HEADER = struct.Struct('<8sQQII')
+_TABLE_COUNT = struct.Struct('<Q')
+_POPCOUNT = bytes(bytearray(bin(i).count('1') for i in range(256)))
+
+def write_prime_table(path, N, block_bytes = 512): # {{{
+	# Sieve [1, N] window by window and write the table to path.
+	block_flags = 8*block_bytes
+	if SEGMENT_SIZE % block_flags != 0:
+		raise ValueError("block_bytes must divide SEGMENT_SIZE // 8")
+	f = open(path, 'wb')
+	try:
+		f.write(_TABLE_HEADER.pack(_TABLE_MAGIC, N, 0, block_bytes, 0))
+		counts = []
+		total = 0
+		crc = 0
+		for _, seg in sieve_segments(1, N):
+			for j in xrange(0, len(seg), block_flags):
+				counts.append(total)
+				total += seg[j:j + block_flags].count(b'\x01')
+			packed = pack_bits(seg)
+			crc = zlib.crc32(bytes(packed), crc)
+			f.write(packed)
+		counts.append(total)
+		num_bytes = f.tell() - _TABLE_HEADER.size
+		f.write(struct.pack('<%dQ' % len(counts), *counts))
+		f.seek(0)
+		f.write(_TABLE_HEADER.pack(_TABLE_MAGIC, N, num_bytes, block_bytes,
+			crc & 0xffffffff))
+	finally:
+		f.close()
+#----------------------------------------------------------------------------}}}
+
+class PrimeTable: # {{{
+	# Read-only view of a file written by write_prime_table. If T is a
+	# PrimeTable, then...
+	#   - T.is_prime(n) tests n in O(1)
+	#   - T.prime_pi(n) is the number of primes <= n, using the block index and a
+	#     popcount of at most one block
+	#   - T.nth_prime(k) is the k-th prime (T.nth_prime(1) = 2), found by binary
+	#     search on the block index
+	# Queries outside [0, T.N] raise IndexError.
+
+	def __init__(self, path): # {{{
+		self._file = open(path, 'rb')
+		self._mm = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+		magic, self.N, self._num_bytes, self._block_bytes, self._crc = \
+			_TABLE_HEADER.unpack_from(self._mm, 0)
+		if magic != _TABLE_MAGIC:
+			self.close()
+			raise ValueError("%s is not a prime table" % path)
+		self._block_flags = 8*self._block_bytes
+		self._bitmap = _TABLE_HEADER.size
+		self._index = self._bitmap + self._num_bytes
+		self._num_blocks = -(-self._num_bytes // self._block_bytes)
+		if len(self._mm) != self._index + _TABLE_COUNT.size*(self._num_blocks + 1):
+			self.close()
+			raise ValueError("%s is truncated" % path)
+	#--------------------------------------------------------------------------}}}
+
+	def _count_before(self, block): # {{{
+		# number of odd primes before the given block
+		return _TABLE_COUNT.unpack_from(self._mm, self._index + _TABLE_COUNT.size*block)[0]
+	#--------------------------------------------------------------------------}}}
+	def _byte(self, i): # {{{
+		return ord(self._mm[self._bitmap + i])
+	#--------------------------------------------------------------------------}}}
+	def _check(self, n): # {{{
+		if not 0 <= n <= self.N:
+			raise IndexError("%d is outside the table [0, %d]" % (n, self.N))
+	#--------------------------------------------------------------------------}}}
+
+	def is_prime(self, n): # {{{
+		self._check(n)
+		if n % 2 == 0:
+			return n == 2
+		i = n // 2
+		return (self._byte(i >> 3) >> (i & 7)) & 1 == 1
+	#--------------------------------------------------------------------------}}}
+	def prime_pi(self, n): # {{{
+		self._check(n)
+		if n < 2:
+			return 0
+		i = (n + 1) // 2        # flags [0, i) are the odd numbers <= n
+		block = i // self._block_flags
+		count = 1 + self._count_before(block)
+		start = self._bitmap + block*self._block_bytes
+		end = self._bitmap + (i >> 3)
+		count += sum(bytearray(self._mm[start:end]).translate(_POPCOUNT))
+		if i & 7:
+			count += bin(self._byte(i >> 3) & ((1 << (i & 7)) - 1)).count('1')
+		return count
+	#--------------------------------------------------------------------------}}}
+	def nth_prime(self, k): # {{{
+		if k < 1:
+			raise ValueError("k must be positive")
+		if k == 1 and self.N >= 2:
+			return 2
+		target = k - 1          # we want the target-th odd prime
+		if target > self._count_before(self._num_blocks) or self.N < 2:
+			raise IndexError("the table holds fewer than %d primes" % k)
+
+		# find the last block with fewer than target odd primes before it
+		lo, hi = 0, self._num_blocks - 1
+		while lo < hi:
+			mid = (lo + hi + 1) // 2
+			if self._count_before(mid) < target:
+				lo = mid
+			else:
+				hi = mid - 1
+		remaining = target - self._count_before(lo)
+
+		i = lo*self._block_bytes
+		while True:
+			byte = self._byte(i)
+			bits = ord(_POPCOUNT[byte])
+			if remaining <= bits:
+				break
+			remaining -= bits
+			i += 1
+		for bit in range(8):
+			if (byte >> bit) & 1:
+				remaining -= 1
+				if remaining == 0:
+					return 2*(8*i + bit) + 1
+	#--------------------------------------------------------------------------}}}
+
+	def verify(self): # {{{
+		# Compare the bitmap against the checksum in the header.
+		crc = 0
+		step = 2**20
+		for start in xrange(self._bitmap, self._index, step):
+			crc = zlib.crc32(self._mm[start:min(start + step, self._index)], crc)
+		return crc & 0xffffffff == self._crc
+	#--------------------------------------------------------------------------}}}
+	def close(self): # {{{
+		self._mm.close()
+		self._file.close()
+	#--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+print ('the solution is ' + str(S(100)))
+
+# you can check the sieve against S like this:
+#print (list(primes(10**4)) == S(10**4))
+#print (prime_count(10**9))
+
+# and measure how the parallel sieve scales with
+#bench_parallel(10**9)
+
+# write a table once, then open it from any process
+#write_prime_table('primes.tbl', 10**9)
+#T = PrimeTable('primes.tbl')
+#print (T.prime_pi(10**9), T.nth_prime(10**6), T.is_prime(999999937))
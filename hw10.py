@@ -1,5 +1,11 @@
 # imports {{{1
 from __future__ import division
+from array import array
+from itertools import islice
+from multiprocessing import Pool
+from multiprocessing.sharedctypes import RawArray
+import mmap
+import os
 from random import randrange
 from sys import maxint
 #---------------------------------------------------------------------------}}}1
@@ -43,6 +49,407 @@ def MSP(A, low, high):
 #----------------------------------------------------------------------------}}}
 
 
+class Kadane: # {{{1
+  # Kadane's algorithm with its state kept between calls, so a sequence can be
+  # fed in pieces with O(1) extra memory. Indices are global positions in the
+  # whole sequence, and a result (i, j, s) means sum(A[i:j]) == s, as in
+  # MSP_bad. The empty subarray counts, so s >= 0.
+  #
+  # Kadane.count is the number of elements fed so far.
+  # Kadane.cur is the best sum of a subarray ending at Kadane.count, and
+  #   Kadane.cur_start is where that subarray starts.
+  # Kadane.best is the best (i, j, s) seen so far.
+
+  def __init__(self): # {{{
+    self.count = 0
+    self.cur = 0
+    self.cur_start = 0
+    self.best = (0, 0, 0)
+  #--------------------------------------------------------------------------}}}
+
+  def feed(self, chunk): # {{{
+    cur, cur_start, best = self.cur, self.cur_start, self.best
+    best_sum = best[2]
+    j = self.count
+    for x in chunk:
+      if cur <= 0:
+        cur = x
+        cur_start = j
+      else:
+        cur += x
+      j += 1
+      if cur > best_sum:
+        best_sum = cur
+        best = (cur_start, j, cur)
+    self.cur, self.cur_start, self.best, self.count = cur, cur_start, best, j
+    return self
+  #--------------------------------------------------------------------------}}}
+  def result(self): # {{{
+    return self.best
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+def MSP_linear(A): # {{{
+  # O(n) maximum subarray. Returns (i, j, sum(A[i:j])).
+  return Kadane().feed(A).result()
+#----------------------------------------------------------------------------}}}
+def MSP_stream(iterable, chunk_size = 2**16): # {{{
+  # Maximum subarray of an iterator, consumed chunk_size elements at a time.
+  it = iter(iterable)
+  K = Kadane()
+  chunk = list(islice(it, chunk_size))
+  while chunk:
+    K.feed(chunk)
+    chunk = list(islice(it, chunk_size))
+  return K.result()
+#----------------------------------------------------------------------------}}}
+def MSP_batch(rows): # {{{
+  # Solve many equal-length arrays at once. rows is anything numpy can turn
+  # into an m x n array. Kadane's recurrence runs column by column, with every
+  # step vectorized over the m rows. Returns arrays (I, J, S) such that row r
+  # has maximum subarray rows[r][I[r]:J[r]] with sum S[r], with the same tie
+  # breaking as MSP_linear.
+  import numpy as np
+
+  A = np.asarray(rows)
+  if A.ndim != 2:
+    raise ValueError("rows must be 2-dimensional")
+  m, n = A.shape
+  cur = np.zeros(m, dtype=A.dtype)
+  cur_start = np.zeros(m, dtype=np.intp)
+  best = np.zeros(m, dtype=A.dtype)
+  best_i = np.zeros(m, dtype=np.intp)
+  best_j = np.zeros(m, dtype=np.intp)
+  for j in range(n):
+    restart = cur <= 0
+    cur[restart] = 0
+    cur += A[:, j]
+    cur_start[restart] = j
+    better = cur > best
+    best[better] = cur[better]
+    best_i[better] = cur_start[better]
+    best_j[better] = j + 1
+  return best_i, best_j, best
+#----------------------------------------------------------------------------}}}
+
+class MSPTree: # {{{1
+  # Segment tree over the divide and conquer of MSP. Every node covers a range
+  # [lo, hi) of A and stores four sums for it:
+  #   MSPTree.tot[k]  -- sum(A[lo:hi])
+  #   MSPTree.pre[k]  -- best sum(A[lo:j])
+  #   MSPTree.suf[k]  -- best sum(A[i:hi])
+  #   MSPTree.best[k] -- best sum(A[i:j])
+  # Empty ranges count, as in MSP_bad, so pre, suf and best are >= 0. A parent
+  # is merged from its children with the crossing sum of MSP: the best window
+  # is in the left half, in the right half, or a suffix of the left plus a
+  # prefix of the right.
+  #
+  # The tree is stored in flat arrays of 2n entries, without padding n to a
+  # power of two: node k has children 2k and 2k+1 and A[i] is the leaf n + i,
+  # so the four arrays hold 8n longs in all. When n is not a power of two a
+  # few nodes near the root cover leaves out of order, but query only uses
+  # nodes whose leaves form a range [lo, hi), in order. If T is an MSPTree,
+  # then...
+  #   - T.query(a, b) returns (i, j, s) where A[i:j] is a best window inside
+  #     A[a:b] and s is its sum, in O(log n)
+  #   - T.update(i, x) sets A[i] = x in O(log n)
+  #   - T[i] is A[i] and len(T) is len(A)
+
+  def __init__(self, A): # {{{
+    self.n = len(A)
+    zeros = array('l', [0]) * (2*self.n)
+    self.tot = array('l', zeros)
+    self.pre = array('l', zeros)
+    self.suf = array('l', zeros)
+    self.best = array('l', zeros)
+
+    for i, x in enumerate(A):
+      self._set_leaf(self.n + i, x)
+    for k in range(self.n - 1, 0, -1):
+      self._merge(k)
+  #--------------------------------------------------------------------------}}}
+
+  def _set_leaf(self, k, x): # {{{
+    self.tot[k] = x
+    self.pre[k] = self.suf[k] = self.best[k] = max(x, 0)
+  #--------------------------------------------------------------------------}}}
+  def _merge(self, k): # {{{
+    tot, pre, suf, best = self.tot, self.pre, self.suf, self.best
+    L, R = 2*k, 2*k + 1
+    tot[k] = tot[L] + tot[R]
+    pre[k] = max(pre[L], tot[L] + pre[R])
+    suf[k] = max(suf[R], tot[R] + suf[L])
+    best[k] = max(best[L], best[R], suf[L] + pre[R])
+  #--------------------------------------------------------------------------}}}
+
+  def _prefix_end(self, k): # {{{
+    # j such that sum(A[lo:j]) == pre[k], where node k covers [lo, hi)
+    while k < self.n:
+      if self.pre[k] == self.pre[2*k]:
+        k = 2*k
+      else:
+        k = 2*k + 1
+    return k - self.n + (1 if self.pre[k] > 0 else 0)
+  #--------------------------------------------------------------------------}}}
+  def _suffix_start(self, k): # {{{
+    # i such that sum(A[i:hi]) == suf[k], where node k covers [lo, hi)
+    while k < self.n:
+      if self.suf[k] == self.suf[2*k + 1]:
+        k = 2*k + 1
+      else:
+        k = 2*k
+    return k - self.n + (0 if self.suf[k] > 0 else 1)
+  #--------------------------------------------------------------------------}}}
+  def _best_window(self, k): # {{{
+    # (i, j) such that sum(A[i:j]) == best[k]
+    while k < self.n:
+      if self.best[k] == self.best[2*k]:
+        k = 2*k
+      elif self.best[k] == self.best[2*k + 1]:
+        k = 2*k + 1
+      else:
+        return self._suffix_start(2*k), self._prefix_end(2*k + 1)
+    i = k - self.n
+    return (i, i + 1) if self.best[k] > 0 else (i, i)
+  #--------------------------------------------------------------------------}}}
+  def _position(self, where): # {{{
+    kind, k = where
+    if kind == 'pre':
+      return self._prefix_end(k)
+    if kind == 'suf':
+      return self._suffix_start(k)
+    return k
+  #--------------------------------------------------------------------------}}}
+
+  def _node(self, k): # {{{
+    # The summary of node k, for query: (tot, pre, pre_end, suf, suf_start,
+    # best, window). Window ends are recorded as ('pre', k) or ('suf', k) and
+    # only resolved for the winner, which keeps the query O(log n).
+    return (self.tot[k], self.pre[k], ('pre', k), self.suf[k], ('suf', k),
+        self.best[k], ('best', k))
+  #--------------------------------------------------------------------------}}}
+  def _empty(self, a): # {{{
+    # the summary of the empty range [a, a)
+    return (0, 0, ('at', a), 0, ('at', a), 0, ('cross', ('at', a), ('at', a)))
+  #--------------------------------------------------------------------------}}}
+  def _combine(self, X, Y): # {{{
+    # Summary of X followed by Y, as in _merge. The order matters: X must be
+    # the range on the left.
+    X_tot, X_pre, X_pre_end, X_suf, X_suf_start, X_best, X_window = X
+    Y_tot, Y_pre, Y_pre_end, Y_suf, Y_suf_start, Y_best, Y_window = Y
+    if X_pre >= X_tot + Y_pre:
+      pre, pre_end = X_pre, X_pre_end
+    else:
+      pre, pre_end = X_tot + Y_pre, Y_pre_end
+    if Y_suf >= Y_tot + X_suf:
+      suf, suf_start = Y_suf, Y_suf_start
+    else:
+      suf, suf_start = Y_tot + X_suf, X_suf_start
+    best, window = X_best, X_window
+    if Y_best > best and Y_best >= X_suf + Y_pre:
+      best, window = Y_best, Y_window
+    elif X_suf + Y_pre > best:
+      best, window = X_suf + Y_pre, ('cross', X_suf_start, Y_pre_end)
+    return (X_tot + Y_tot, pre, pre_end, suf, suf_start, best, window)
+  #--------------------------------------------------------------------------}}}
+
+  def query(self, a, b): # {{{
+    if not 0 <= a <= b <= self.n:
+      raise IndexError("bad range [%d, %d)" % (a, b))
+
+    # Walk up from the leaves of a and b, folding the O(log n) nodes covering
+    # [a, b) into a left summary (for nodes taken from the left end) and a
+    # right summary (for nodes taken from the right end), then join the two.
+    left, right = self._empty(a), self._empty(b)
+    l, r = a + self.n, b + self.n
+    while l < r:
+      if l & 1:
+        left = self._combine(left, self._node(l))
+        l += 1
+      if r & 1:
+        r -= 1
+        right = self._combine(self._node(r), right)
+      l //= 2
+      r //= 2
+    best, window = self._combine(left, right)[5:]
+
+    if window[0] == 'best':
+      i, j = self._best_window(window[1])
+    else:
+      i, j = self._position(window[1]), self._position(window[2])
+    return i, j, best
+  #--------------------------------------------------------------------------}}}
+  def update(self, i, x): # {{{
+    if not 0 <= i < self.n:
+      raise IndexError(i)
+    k = self.n + i
+    self._set_leaf(k, x)
+    k //= 2
+    while k >= 1:
+      self._merge(k)
+      k //= 2
+  #--------------------------------------------------------------------------}}}
+
+  def __getitem__(self, i): # {{{
+    if not 0 <= i < self.n:
+      raise IndexError(i)
+    return self.tot[self.n + i]
+  #--------------------------------------------------------------------------}}}
+  def __len__(self): # {{{
+    return self.n
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+
+# Parallel MSP {{{1
+# The array is cut into chunks and every worker process reduces its chunk to
+# a summary
+#   (tot, pre, pre_end, suf, suf_start, (i, j, best))
+# with sum(A[lo:pre_end]) == pre, sum(A[suf_start:hi]) == suf and
+# sum(A[i:j]) == best, where [lo, hi) is the chunk. Summaries of neighbouring
+# chunks merge with the crossing sum of MSP, so the chunk results fold into
+# the answer for the whole array.
+#
+# The data is never pickled to the workers. It is either a RawArray from
+# shared_array, which the workers inherit, or the path of a file of native
+# int64 values (see write_int64), which every worker maps with mmap. MSP_file
+# reads such a file in a single process.
+
+WINDOW_SIZE = 2**16
+
+_source = None
+
+def shared_array(A): # {{{
+  # Copy A into shared memory that pool workers can read.
+  S = RawArray('l', len(A))
+  for lo in xrange(0, len(A), WINDOW_SIZE):
+    S[lo:lo + WINDOW_SIZE] = A[lo:lo + WINDOW_SIZE]
+  return S
+#----------------------------------------------------------------------------}}}
+def write_int64(path, A): # {{{
+  f = open(path, 'wb')
+  try:
+    for lo in xrange(0, len(A), WINDOW_SIZE):
+      array('l', A[lo:lo + WINDOW_SIZE]).tofile(f)
+  finally:
+    f.close()
+#----------------------------------------------------------------------------}}}
+def _open_source(source): # {{{
+  # A path is mapped into memory; shared arrays are used as they are.
+  if isinstance(source, str):
+    f = open(source, 'rb')
+    try:
+      if os.fstat(f.fileno()).st_size == 0:
+        return ''
+      return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+      f.close()
+  return source
+#----------------------------------------------------------------------------}}}
+def _source_len(source): # {{{
+  if isinstance(source, str):
+    size = os.path.getsize(source)
+    if size % 8 != 0:
+      raise ValueError("%s does not hold whole int64 values" % source)
+    return size // 8
+  return len(source)
+#----------------------------------------------------------------------------}}}
+def _windows(data, lo, hi, window_size = WINDOW_SIZE): # {{{
+  # Yield data[lo:hi] as a sequence of arrays of at most window_size values.
+  for w in xrange(lo, hi, window_size):
+    end = min(w + window_size, hi)
+    if isinstance(data, mmap.mmap):
+      window = array('l')
+      window.fromstring(data[8*w:8*end])
+      yield window
+    else:
+      yield data[w:end]
+#----------------------------------------------------------------------------}}}
+
+def _summarize(windows, lo): # {{{
+  # One pass over the windows, which hold A[lo:hi] in order.
+  tot = pre = min_prefix = 0
+  pre_end = suf_start = lo
+  cur, cur_start, best = 0, lo, (lo, lo, 0)
+  j = lo
+  for window in windows:
+    for x in window:
+      if cur <= 0:
+        cur = x
+        cur_start = j
+      else:
+        cur += x
+      tot += x
+      j += 1
+      if cur > best[2]:
+        best = (cur_start, j, cur)
+      if tot > pre:
+        pre, pre_end = tot, j
+      if tot < min_prefix:
+        min_prefix, suf_start = tot, j
+  return (tot, pre, pre_end, tot - min_prefix, suf_start, best)
+#----------------------------------------------------------------------------}}}
+def _merge_summaries(L, R): # {{{
+  # Summary of the concatenation of the chunks summarized by L and R.
+  (Ltot, Lpre, Lpre_end, Lsuf, Lsuf_start, Lbest) = L
+  (Rtot, Rpre, Rpre_end, Rsuf, Rsuf_start, Rbest) = R
+
+  pre, pre_end = Lpre, Lpre_end
+  if Ltot + Rpre > Lpre:
+    pre, pre_end = Ltot + Rpre, Rpre_end
+  suf, suf_start = Rsuf, Rsuf_start
+  if Rtot + Lsuf > Rsuf:
+    suf, suf_start = Rtot + Lsuf, Lsuf_start
+  best = max(Lbest, Rbest, (Lsuf_start, Rpre_end, Lsuf + Rpre),
+             key=lambda triple: triple[2])
+  return (Ltot + Rtot, pre, pre_end, suf, suf_start, best)
+#----------------------------------------------------------------------------}}}
+def _init_worker(source): # {{{
+  global _source
+  _source = _open_source(source)
+#----------------------------------------------------------------------------}}}
+def _chunk_summary(job): # {{{
+  lo, hi = job
+  return _summarize(_windows(_source, lo, hi), lo)
+#----------------------------------------------------------------------------}}}
+
+def MSP_file(path, window_size = WINDOW_SIZE): # {{{
+  # Maximum subarray of a file of native int64 values (see write_int64). The
+  # file is mapped with mmap and fed to Kadane one window at a time, so memory
+  # use does not depend on the file size. Returns (i, j, s) like MSP_linear.
+  n = _source_len(path)
+  data = _open_source(path)
+  K = Kadane()
+  try:
+    for window in _windows(data, 0, n, window_size):
+      K.feed(window)
+  finally:
+    if isinstance(data, mmap.mmap):
+      data.close()
+  return K.result()
+#----------------------------------------------------------------------------}}}
+def MSP_parallel(source, processes = None, chunk_size = 2**20): # {{{
+  # Maximum subarray of a shared_array or an int64 file, computed by a pool
+  # of processes. Returns (i, j, s) like MSP_linear.
+  n = _source_len(source)
+  if n == 0:
+    return (0, 0, 0)
+  jobs = ( (lo, min(lo + chunk_size, n)) for lo in xrange(0, n, chunk_size) )
+  pool = Pool(processes, _init_worker, (source,))
+  try:
+    summary = None
+    for chunk in pool.imap(_chunk_summary, jobs):
+      summary = chunk if summary is None else _merge_summaries(summary, chunk)
+    pool.close()
+  finally:
+    pool.terminate()
+    pool.join()
+  return summary[5]
+#----------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+
+
 # run this to test out your algorithm
 for _ in range(10**3):
   A = rand_MSP(randrange(1,51), randrange(101))
@@ -53,4 +460,14 @@ for _ in range(10**3):
     print A
     print B
     print G
-    break
\ No newline at end of file
+    break
+
+# MSP_linear and MSP_stream should agree with MSP_bad exactly
+#for _ in range(10**3):
+#  A = rand_MSP(randrange(1,51), randrange(101))
+#  B = MSP_bad(A)
+#  K = MSP_linear(A)
+#  if not ( sum(A[K[0]:K[1]]) == K[2] == B[2] == MSP_stream(A, 7)[2] ):
+#    print "whoops"
+#    print A, B, K
+#    break
@@ -1,35 +1,108 @@
 # imports {{{1
 from __future__ import division
-from random import randrange
+from array import array
+from collections import Counter
+import random
+from random import Random, randrange
+import sys
+import time
 # ---------------------------------------------------------------------------}}}1
 
 
-def rand_perm(size):  # {{{
-    p = []
-    while len(p) < size:
-        r = randrange(size)
-        if r not in p:
-            p.append(r)
+def rand_perm(size, rng=random):  # {{{
+    # Fisher-Yates shuffle of range(size), O(size). Pass rng=Random(seed) for a
+    # reproducible permutation.
+    p = range(size)
+    for i in xrange(size - 1, 0, -1):
+        j = rng.randrange(i + 1)
+        p[i], p[j] = p[j], p[i]
     return p
 # ----------------------------------------------------------------------------}}}
 
 
-def rand_cards(n, max_value=2):  # {{{
-    base = []
+def _card_counts(n, max_value, rng):  # {{{
+    # How many cards of each value 1..max_value rand_cards deals. max_value
+    # gets the rest, which is a strict majority.
+    counts = []
     for value in range(1, max_value):
-        max_reps = n//2 - len(base) - 1 + (n % 2)
+        max_reps = n//2 - sum(counts) - 1 + (n % 2)
         if max_reps == 0:
             break
-        base += [value]*randrange(1, max_reps+1)
-    base += [max_value]*(n-len(base))
+        counts.append(rng.randrange(1, max_reps+1))
+    counts += [0]*(max_value - 1 - len(counts))
+    counts.append(n - sum(counts))
+    return counts
+# ----------------------------------------------------------------------------}}}
+
+
+def rand_cards(n, max_value=2, rng=random):  # {{{
+    base = []
+    for value, count in enumerate(_card_counts(n, max_value, rng), 1):
+        base += [value]*count
 
-    perm = rand_perm(n)
+    perm = rand_perm(n, rng)
     base_perm = [base[perm[i]] for i in range(n)]
 
     return base_perm
 # ----------------------------------------------------------------------------}}}
 
 
+def card_stream(n, max_value=2, seed=None, chunk_size=2**16):  # {{{
+    # Deal the same kind of deck as rand_cards, as a generator of lists of at
+    # most chunk_size cards, without ever holding the deck. Each card is drawn
+    # from the cards still left, value v with probability
+    # (cards of value v left) / (cards left), which gives a uniformly random
+    # arrangement, like a full shuffle. Costs O(max_value) per card. The same
+    # seed gives the same deck.
+    rng = Random(seed)
+    left = _card_counts(n, max_value, rng)
+    remaining = n
+    while remaining > 0:
+        chunk = []
+        for _ in xrange(min(chunk_size, remaining)):
+            r = rng.randrange(remaining)
+            value = 0
+            while r >= left[value]:
+                r -= left[value]
+                value += 1
+            left[value] -= 1
+            remaining -= 1
+            chunk.append(value + 1)
+        yield chunk
+# ----------------------------------------------------------------------------}}}
+
+
+def write_cards(path, n, max_value=2, seed=None, chunk_size=2**16):  # {{{
+    # Write a card_stream deck to path as native int64 values, one chunk at a
+    # time.
+    f = open(path, 'wb')
+    try:
+        for chunk in card_stream(n, max_value, seed, chunk_size):
+            array('l', chunk).tofile(f)
+    finally:
+        f.close()
+# ----------------------------------------------------------------------------}}}
+
+
+def read_cards(path, chunk_size=2**16):  # {{{
+    # Generate the cards of a file written by write_cards, chunk by chunk.
+    f = open(path, 'rb')
+    try:
+        while True:
+            chunk = array('l')
+            try:
+                chunk.fromfile(f, chunk_size)
+            except EOFError:
+                pass
+            if not chunk:
+                break
+            for card in chunk:
+                yield card
+    finally:
+        f.close()
+# ----------------------------------------------------------------------------}}}
+
+
 def all_same(items):
     return all(x == items[0] for x in items)
 
@@ -64,6 +137,257 @@ def credit_card(L):  # {{{
 # ----------------------------------------------------------------------------}}}
 
 
+class MajorityVote:  # {{{1
+    # Boyer-Moore majority vote. MajorityVote.candidate is the only value that
+    # can occur more than half the time in what has been fed so far, and
+    # MajorityVote.votes is its lead over everything else. The state is O(1),
+    # so a stream can be fed in pieces with MajorityVote.feed.
+    #
+    # Votes on separate shards can be combined with MajorityVote.merge: if a
+    # value is a majority of the union, it is a majority of at least one
+    # shard, and it survives every merge. The candidate still has to be checked
+    # by counting it (see majority).
+
+    def __init__(self, candidate=None, votes=0):  # {{{
+        self.candidate = candidate
+        self.votes = votes
+    # --------------------------------------------------------------------------}}}
+
+    def feed(self, items):  # {{{
+        candidate, votes = self.candidate, self.votes
+        for x in items:
+            if votes == 0:
+                candidate, votes = x, 1
+            elif x == candidate:
+                votes += 1
+            else:
+                votes -= 1
+        self.candidate, self.votes = candidate, votes
+        return self
+    # --------------------------------------------------------------------------}}}
+
+    def merge(self, other):  # {{{
+        # Vote on the two shards together: equal candidates add up, otherwise
+        # the weaker candidate cancels against the stronger one.
+        if self.candidate == other.candidate:
+            return MajorityVote(self.candidate, self.votes + other.votes)
+        if self.votes >= other.votes:
+            return MajorityVote(self.candidate, self.votes - other.votes)
+        return MajorityVote(other.candidate, other.votes - self.votes)
+    # --------------------------------------------------------------------------}}}
+# ----------------------------------------------------------------------------}}}1
+
+
+def majority(L):  # {{{
+    # O(n) time, O(1) space version of credit_card: one pass to vote, one pass
+    # to count the candidate. Returns (element, count) where count is the true
+    # number of occurrences, or (None, 0) if there is no majority.
+    vote = MajorityVote().feed(L)
+    if vote.votes == 0:
+        return None, 0
+    count = L.count(vote.candidate)
+    if 2*count > len(L):
+        return vote.candidate, count
+    return None, 0
+# ----------------------------------------------------------------------------}}}
+
+
+def majority_stream(make_iter):  # {{{
+    # Like majority, for data that is too big to hold. make_iter() must return a
+    # fresh iterator over the same items each time it is called; it is called
+    # twice.
+    vote = MajorityVote().feed(make_iter())
+    if vote.votes == 0:
+        return None, 0
+    count = total = 0
+    for x in make_iter():
+        total += 1
+        if x == vote.candidate:
+            count += 1
+    if 2*count > total:
+        return vote.candidate, count
+    return None, 0
+# ----------------------------------------------------------------------------}}}
+
+
+def _vote_shard(shard):  # {{{
+    return MajorityVote().feed(shard)
+# ----------------------------------------------------------------------------}}}
+
+
+def _count_shard(args):  # {{{
+    shard, candidate = args
+    return sum(1 for x in shard if x == candidate), len(shard)
+# ----------------------------------------------------------------------------}}}
+
+
+def majority_shards(shards, pool=None):  # {{{
+    # Majority over the union of a list of shards. Every shard is voted on
+    # independently, the votes are merged, and the candidate is counted shard by
+    # shard. If pool is a multiprocessing.Pool, both passes run on it.
+    map_ = pool.map if pool is not None else map
+    vote = MajorityVote()
+    for shard_vote in map_(_vote_shard, shards):
+        vote = vote.merge(shard_vote)
+    if vote.votes == 0:
+        return None, 0
+    count = total = 0
+    for shard_count, shard_len in map_(_count_shard,
+                                       [(shard, vote.candidate) for shard in shards]):
+        count += shard_count
+        total += shard_len
+    if 2*count > total:
+        return vote.candidate, count
+    return None, 0
+# ----------------------------------------------------------------------------}}}
+
+
+class HeavyHitters:  # {{{1
+    # Misra-Gries summary: keeps at most k-1 counters, and every value that
+    # occurs more than n/k times among the n items fed so far is guaranteed to
+    # have one. A counter underestimates the true count by at most n/k, so the
+    # candidates have to be counted exactly to be sure (see heavy_hitters).
+    # MajorityVote is the case k = 2.
+    #
+    # HeavyHitters.counters is the dictionary {value: counter}.
+    # HeavyHitters.n is the number of items fed so far.
+    #
+    # Summaries of separate shards combine with HeavyHitters.merge, which keeps
+    # the same guarantee for the union of the shards.
+
+    def __init__(self, k):  # {{{
+        if k < 2:
+            raise ValueError("k must be at least 2")
+        self.k = k
+        self.counters = {}
+        self.n = 0
+    # --------------------------------------------------------------------------}}}
+
+    def feed(self, items):  # {{{
+        counters = self.counters
+        size = self.k - 1
+        n = 0
+        for x in items:
+            n += 1
+            if x in counters:
+                counters[x] += 1
+            elif len(counters) < size:
+                counters[x] = 1
+            else:
+                # decrement everything; each item is decremented at most once
+                # per increment, so this is O(1) amortized
+                for y in counters.keys():
+                    if counters[y] == 1:
+                        del counters[y]
+                    else:
+                        counters[y] -= 1
+        self.n += n
+        return self
+    # --------------------------------------------------------------------------}}}
+
+    def merge(self, other):  # {{{
+        # Add the counters, then subtract the k-th largest from all of them so
+        # that at most k-1 stay positive.
+        if other.k != self.k:
+            raise ValueError("cannot merge summaries with different k")
+        merged = HeavyHitters(self.k)
+        merged.n = self.n + other.n
+        counters = Counter(self.counters)
+        counters.update(other.counters)
+        if len(counters) > self.k - 1:
+            cut = sorted(counters.values(), reverse=True)[self.k - 1]
+            counters = {x: c - cut for x, c in counters.iteritems() if c > cut}
+        merged.counters = dict(counters)
+        return merged
+    # --------------------------------------------------------------------------}}}
+
+    def candidates(self):  # {{{
+        return self.counters.keys()
+    # --------------------------------------------------------------------------}}}
+# ----------------------------------------------------------------------------}}}1
+
+
+def _exact_counts(items, candidates):  # {{{
+    # exact counts of the candidates, and the number of items
+    counts = dict.fromkeys(candidates, 0)
+    n = 0
+    for x in items:
+        n += 1
+        if x in counts:
+            counts[x] += 1
+    return counts, n
+# ----------------------------------------------------------------------------}}}
+
+
+def heavy_hitters(L, k, verify=True):  # {{{
+    # Return {value: count} for the values that occur more than len(L)/k times
+    # in L. With verify=False, skip the second pass and return the Misra-Gries
+    # candidates with their (under-)estimated counters instead; this may include
+    # values below the threshold.
+    summary = HeavyHitters(k).feed(L)
+    if not verify:
+        return dict(summary.counters)
+    counts, n = _exact_counts(L, summary.candidates())
+    return {x: c for x, c in counts.iteritems() if c*k > n}
+# ----------------------------------------------------------------------------}}}
+
+
+def _summarize_shard(args):  # {{{
+    shard, k = args
+    return HeavyHitters(k).feed(shard)
+# ----------------------------------------------------------------------------}}}
+
+
+def _count_candidates(args):  # {{{
+    shard, candidates = args
+    return _exact_counts(shard, candidates)
+# ----------------------------------------------------------------------------}}}
+
+
+def heavy_hitters_shards(shards, k, pool=None):  # {{{
+    # heavy_hitters over the union of a list of shards. If pool is a
+    # multiprocessing.Pool, the shards are summarized and counted on it.
+    map_ = pool.map if pool is not None else map
+    summary = HeavyHitters(k)
+    for shard_summary in map_(_summarize_shard, [(shard, k) for shard in shards]):
+        summary = summary.merge(shard_summary)
+    candidates = summary.candidates()
+    totals = dict.fromkeys(candidates, 0)
+    n = 0
+    for counts, shard_n in map_(_count_candidates,
+                                [(shard, candidates) for shard in shards]):
+        n += shard_n
+        for x, c in counts.iteritems():
+            totals[x] += c
+    return {x: c for x, c in totals.iteritems() if c*k > n}
+# ----------------------------------------------------------------------------}}}
+
+
+def bench_heavy_hitters(n=10**6, k=100, num_values=10**5):  # {{{
+    # Compare HeavyHitters with a collections.Counter over a skewed stream:
+    # half the items are drawn from 10 hot values, the rest from num_values.
+    L = [randrange(10) if randrange(2) else randrange(num_values)
+         for _ in xrange(n)]
+
+    start = time.time()
+    summary = HeavyHitters(k).feed(L)
+    mg_time = time.time() - start
+    mg_size = sys.getsizeof(summary.counters)
+
+    start = time.time()
+    counter = Counter(L)
+    counter_time = time.time() - start
+    counter_size = sys.getsizeof(counter)
+
+    print "Misra-Gries: %.0f items/s, %d counters, %d bytes" % (
+        n / mg_time, len(summary.counters), mg_size)
+    print "Counter:     %.0f items/s, %d counters, %d bytes" % (
+        n / counter_time, len(counter), counter_size)
+    print "heavy hitters agree:", \
+        heavy_hitters(L, k) == {x: c for x, c in counter.iteritems() if c*k > n}
+# ----------------------------------------------------------------------------}}}
+
+
 # test your credit_card() solution using something like this
 for i in xrange(10**4):
     v = randrange(2, 30)
@@ -77,3 +401,6 @@ for i in xrange(10**4):
         print v
         print "loop: " + str(i)
         break
+
+# compare the Misra-Gries summary with a plain Counter
+#bench_heavy_hitters(10**7)
@@ -1,5 +1,10 @@
 # imports {{{1
 from __future__ import division
+from array import array
+from collections import OrderedDict
+from operator import add
+from random import randrange
+import time
 # ---------------------------------------------------------------------------}}}1
 
 
@@ -27,7 +32,213 @@ def modified_rod_cut(P, n):  # {{{
 # ----------------------------------------------------------------------------}}}
 
 
+def _fill_rod_cut_table(P, R, first, lo, hi, cut_cost):  # {{{
+    # Fill R[k] and first[k] for k = lo, ..., hi, given that they are filled
+    # for every length below lo.
+    for k in range(lo, hi+1):
+        best_rev, best_first = P[k], k
+        if callable(cut_cost):
+            for l in range(1, k):
+                rev = P[l] + R[k-l] - cut_cost(k, l)
+                if rev > best_rev:
+                    best_rev, best_first = rev, l
+        elif k > 1:
+            # revs[l-1] = P[l] + R[k-l] for l = 1, ..., k-1
+            revs = map(add, P[1:k], R[k-1:0:-1])
+            max_rev = max(revs)
+            if max_rev - cut_cost > best_rev:
+                best_rev, best_first = max_rev - cut_cost, revs.index(max_rev) + 1
+        R[k] = best_rev
+        first[k] = best_first
+# ----------------------------------------------------------------------------}}}
+
+
+def rod_cut_table(P, n, cut_cost=1):  # {{{
+    """
+    Bottom-up DP for rod cutting where every cut has a cost. Returns arrays R
+    and first, where R[k] is the best revenue for a rod of length k and
+    first[k] is the length of the first piece in a best cutting (first[k] = k
+    means no cut). Only these two arrays are kept, so memory is O(n) and time
+    is O(n^2).
+    - cut_cost is either the cost of one cut, or a function cut_cost(k, l)
+      giving the cost of cutting a piece of length l off a rod of length k.
+    """
+    if n >= len(P):
+        raise ValueError("P has no price for a rod of length %d" % n)
+    integral = not callable(cut_cost) and \
+        all(isinstance(x, (int, long)) for x in list(P[:n+1]) + [cut_cost])
+    R = array('l' if integral else 'd', [0]) * (n+1)
+    first = array('l', [0]) * (n+1)
+    _fill_rod_cut_table(P, R, first, 1, n, cut_cost)
+    return R, first
+# ----------------------------------------------------------------------------}}}
+
+
+def rod_cut_pieces(first, n):  # {{{
+    # Rebuild the list of pieces for a rod of length n from the first array of
+    # rod_cut_table.
+    C = []
+    while n > 0:
+        C.append(first[n])
+        n -= first[n]
+    return C
+# ----------------------------------------------------------------------------}}}
+
+
+def rod_cut(P, n, cut_cost=1):  # {{{
+    """
+    Same interface as modified_rod_cut: returns the pair C, R of the piece
+    sizes and the revenue, here with each cut costing cut_cost (see
+    rod_cut_table).
+    """
+    R, first = rod_cut_table(P, n, cut_cost)
+    return rod_cut_pieces(first, n), R[n]
+# ----------------------------------------------------------------------------}}}
+
+
+class RodCutter:  # {{{1
+    # A rod cutting solver that keeps its DP table between queries. If S is a
+    # RodCutter for prices P and rods up to length n, then...
+    #   - S.cut(k) returns (C, R) like rod_cut(P, k), and S.revenue(k) returns R
+    #   - S.set_price(k, p) sets P[k] = p. The revenue of a rod of length j only
+    #     depends on P[1..j], so only the lengths >= k are recomputed, and only
+    #     at the next query.
+    #
+    # Solved tables are also kept in an LRU cache keyed on the price table, so
+    # going back to a table that was solved recently costs one copy instead of
+    # a solve. RodCutter.hits and RodCutter.misses count cache lookups.
+
+    def __init__(self, P, n=None, cut_cost=1, cache_size=32):  # {{{
+        self.P = list(P)
+        self.n = len(self.P) - 1 if n is None else n
+        self.cut_cost = cut_cost
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self.R, self.first = rod_cut_table(self.P, self.n, cut_cost)
+        self._valid = self.n        # R[k], first[k] are up to date for k <= _valid
+        self._store()
+    # --------------------------------------------------------------------------}}}
+
+    def _key(self):  # {{{
+        return tuple(self.P[:self.n+1])
+    # --------------------------------------------------------------------------}}}
+    def _store(self):  # {{{
+        self._cache[self._key()] = (array(self.R.typecode, self.R), array('l', self.first))
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    # --------------------------------------------------------------------------}}}
+    def _solve(self):  # {{{
+        if self._valid == self.n:
+            return
+        key = self._key()
+        if key in self._cache:
+            self.hits += 1
+            R, first = self._cache.pop(key)
+            self._cache[key] = (R, first)     # most recently used
+            self.R, self.first = array(R.typecode, R), array('l', first)
+        else:
+            self.misses += 1
+            _fill_rod_cut_table(self.P, self.R, self.first, self._valid + 1,
+                                self.n, self.cut_cost)
+            self._store()
+        self._valid = self.n
+    # --------------------------------------------------------------------------}}}
+
+    def set_price(self, k, price):  # {{{
+        if not 0 < k <= self.n:
+            raise IndexError("no rod of length %d" % k)
+        if self.P[k] == price:
+            return
+        self.P[k] = price
+        if self.R.typecode == 'l' and not isinstance(price, (int, long)):
+            self.R = array('d', self.R)
+        self._valid = min(self._valid, k - 1)
+    # --------------------------------------------------------------------------}}}
+    def revenue(self, k=None):  # {{{
+        self._solve()
+        return self.R[self.n if k is None else k]
+    # --------------------------------------------------------------------------}}}
+    def cut(self, k=None):  # {{{
+        self._solve()
+        if k is None:
+            k = self.n
+        return rod_cut_pieces(self.first, k), self.R[k]
+    # --------------------------------------------------------------------------}}}
+# ----------------------------------------------------------------------------}}}1
+
+
+def rod_cut_batch(P, n, cut_cost=1):  # {{{
+    """
+    rod_cut_table for many price tables at once. P is an m x (n+1) (or wider)
+    array, one price table per row, and cut_cost is one cost for every table
+    or an array of m costs. The DP runs over the lengths k = 1, ..., n, and
+    each step is a single NumPy operation over all tables and all splits.
+    Returns arrays R and first of shape m x (n+1): R[i, k] is the best revenue
+    for a rod of length k with prices P[i], and rod_cut_pieces(first[i], k)
+    gives the pieces.
+    """
+    import numpy as np
+
+    P = np.asarray(P)
+    if P.ndim != 2:
+        raise ValueError("P must be 2-dimensional")
+    if n >= P.shape[1]:
+        raise ValueError("P has no price for a rod of length %d" % n)
+    m = P.shape[0]
+    cost = np.asarray(cut_cost)
+    R = np.zeros((m, n+1), dtype=np.result_type(P, cost))
+    first = np.zeros((m, n+1), dtype=np.intp)
+    tables = np.arange(m)
+    for k in range(1, n+1):
+        if k == 1:
+            R[:, 1] = P[:, 1]
+            first[:, 1] = 1
+            continue
+        # revs[i, l-1] = P[i, l] + R[i, k-l] for l = 1, ..., k-1
+        revs = P[:, 1:k] + R[:, k-1:0:-1]
+        l = revs.argmax(axis=1)
+        cut_rev = revs[tables, l] - cost
+        cut = cut_rev > P[:, k]
+        R[:, k] = np.where(cut, cut_rev, P[:, k])
+        first[:, k] = np.where(cut, l + 1, k)
+    return R, first
+# ----------------------------------------------------------------------------}}}
+
+
+def bench_rod_cut_batch(m=1000, n=100):  # {{{
+    # Time rod_cut_batch on m random price tables against calling
+    # modified_rod_cut and rod_cut once per table.
+    P = [[0] + sorted(randrange(1, 10*n) for _ in range(n)) for _ in range(m)]
+
+    start = time.time()
+    R, first = rod_cut_batch(P, n)
+    batch_time = time.time() - start
+
+    start = time.time()
+    for prices in P:
+        rod_cut(prices, n)
+    loop_time = time.time() - start
+
+    start = time.time()
+    for prices in P:
+        modified_rod_cut(prices, n)
+    old_time = time.time() - start
+
+    print "rod_cut_batch:          %.3fs" % batch_time
+    print "rod_cut per table:      %.3fs (%.0fx)" % (loop_time, loop_time / batch_time)
+    print "modified_rod_cut loop:  %.3fs (%.0fx)" % (old_time, old_time / batch_time)
+    print "revenues agree:", all(R[i, n] == rod_cut(P[i], n)[1] for i in range(m))
+# ----------------------------------------------------------------------------}}}
+
+
 P = [0, 1, 5, 8, 9, 10, 17, 17, 20]
 a, b = modified_rod_cut(P, 8)
 print a
 print b
+
+print rod_cut(P, 8)
+
+# compare the batch solver with solving one table at a time
+#bench_rod_cut_batch()
@@ -1,7 +1,16 @@
 # imports {{{1
 from __future__ import division
-import math
+import cPickle
+import heapq
+from itertools import islice
+from multiprocessing import Process, Queue
+from multiprocessing.managers import BaseManager
+import os
 from random import randrange
+import resource
+import tempfile
+import threading
+import time
 #---------------------------------------------------------------------------}}}1
 
 class Heap: # {{{1
@@ -117,12 +126,19 @@ class Heap: # {{{1
       index = min_child_index
   #---------------------------------------------------------------------------}}}
   def _level(self,index): # {{{
-    return int( math.floor( math.log(index+1) ) )
+    return (index+1).bit_length() - 1    # floor(log2(index+1))
   #----------------------------------------------------------------------------}}}
   def remove(self, index):  # {{{
-    self.nodes[index] = self.nodes[-1]
-    del self.nodes[-1]
-    self._heapify_down(index)
+    last = self.nodes.pop()
+    if index < len(self.nodes):
+      self.nodes[index] = last
+      self._heapify_down(index)
+  #--------------------------------------------------------------------------}}}
+  def pop(self):  # {{{
+    # remove and return the node at the top
+    top = self.nodes[0]
+    self.remove(0)
+    return top
   #--------------------------------------------------------------------------}}}
 
   def __getitem__(self, index):  # {{{
@@ -139,9 +155,280 @@ class Heap: # {{{1
   #--------------------------------------------------------------------------}}}
 #----------------------------------------------------------------------------}}}1
 
-class PQ: # {{{1
+class ArrayHeap: # {{{1
+  # Same interface as Heap, with the nodes stored in two parallel lists:
+  # ArrayHeap.keys[i] and ArrayHeap.values[i] are the key and value of node i,
+  # so H[i] == (H.keys[i], H.values[i]). The tree layout is the one of Heap.
+  #
+  # The differences are in the running time:
+  #   - the initial list is turned into a heap bottom up, in O(n), instead of
+  #     with n calls to add
+  #   - sifting up and down are loops that move a "hole" instead of swapping,
+  #     and use no logarithms or temporary lists
+  # ArrayHeap.pop() removes and returns the (key, value) pair at the top.
+
+  def __init__(self, initial = []): # {{{
+    self.keys = [ k for (k,v) in initial ]
+    self.values = [ v for (k,v) in initial ]
+    for index in range(len(self.keys)//2 - 1, -1, -1):
+      self._sift_down(index)
+  #--------------------------------------------------------------------------}}}
+
+  def _sift_up(self, index): # {{{
+    keys, values = self.keys, self.values
+    key, value = keys[index], values[index]
+    while index > 0:
+      parent = (index - 1) >> 1
+      if not key < keys[parent]:
+        break
+      keys[index], values[index] = keys[parent], values[parent]
+      index = parent
+    keys[index], values[index] = key, value
+  #--------------------------------------------------------------------------}}}
+  def _sift_down(self, index): # {{{
+    keys, values = self.keys, self.values
+    n = len(keys)
+    key, value = keys[index], values[index]
+    child = 2*index + 1
+    while child < n:
+      if child + 1 < n and keys[child + 1] < keys[child]:
+        child += 1
+      if not keys[child] < key:
+        break
+      keys[index], values[index] = keys[child], values[child]
+      index = child
+      child = 2*index + 1
+    keys[index], values[index] = key, value
+  #--------------------------------------------------------------------------}}}
+
+  def add(self, new_node): # {{{
+    # new_node is a tuple, new_node=(key,value)
+    self.keys.append(new_node[0])
+    self.values.append(new_node[1])
+    self._sift_up(len(self.keys) - 1)
+  #--------------------------------------------------------------------------}}}
+  def remove(self, index): # {{{
+    # Move the last node into the hole, which may need to go either way.
+    last_key, last_value = self.keys.pop(), self.values.pop()
+    if index == len(self.keys):
+      return
+    self.keys[index], self.values[index] = last_key, last_value
+    self._sift_down(index)
+    self._sift_up(index)
+  #--------------------------------------------------------------------------}}}
+  def pop(self): # {{{
+    if len(self.keys) == 0:
+      raise IndexError("pop from an empty heap")
+    top = (self.keys[0], self.values[0])
+    self.remove(0)
+    return top
+  #--------------------------------------------------------------------------}}}
+  def replace(self, new_node): # {{{
+    # Pop the top and add new_node with a single sift; returns the old top.
+    if len(self.keys) == 0:
+      raise IndexError("replace on an empty heap")
+    top = (self.keys[0], self.values[0])
+    self.keys[0], self.values[0] = new_node
+    self._sift_down(0)
+    return top
+  #--------------------------------------------------------------------------}}}
+
+  def __getitem__(self, index): # {{{
+    return (self.keys[index], self.values[index])
+  #--------------------------------------------------------------------------}}}
+  def __delitem__(self, index): # {{{
+    self.remove(index)
+  #--------------------------------------------------------------------------}}}
+  def __len__(self): # {{{
+    return len(self.keys)
+  #--------------------------------------------------------------------------}}}
+  def __str__(self): # {{{
+    return str(zip(self.keys, self.values))
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+class DaryHeap(ArrayHeap): # {{{1
+  # ArrayHeap where every node has d children: the children of node i are
+  # d*i + 1, ..., d*i + d. A larger d makes the tree shallower, so add (which
+  # sifts up) is cheaper and the levels are more compact in memory, while pop
+  # (which sifts down) compares d children per level.
+
+  def __init__(self, initial = [], d = 4): # {{{
+    self.d = d
+    ArrayHeap.__init__(self, initial)
+  #--------------------------------------------------------------------------}}}
+
+  def _sift_up(self, index): # {{{
+    keys, values, d = self.keys, self.values, self.d
+    key, value = keys[index], values[index]
+    while index > 0:
+      parent = (index - 1) // d
+      if not key < keys[parent]:
+        break
+      keys[index], values[index] = keys[parent], values[parent]
+      index = parent
+    keys[index], values[index] = key, value
+  #--------------------------------------------------------------------------}}}
+  def _sift_down(self, index): # {{{
+    keys, values, d = self.keys, self.values, self.d
+    n = len(keys)
+    key, value = keys[index], values[index]
+    first = d*index + 1
+    while first < n:
+      child = first
+      for c in range(first + 1, min(first + d, n)):
+        if keys[c] < keys[child]:
+          child = c
+      if not keys[child] < key:
+        break
+      keys[index], values[index] = keys[child], values[child]
+      index = child
+      first = d*index + 1
+    keys[index], values[index] = key, value
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+class PairingHeap: # {{{1
+  # A pairing heap. Every node is a list [key, value, child, sibling], where
+  # child is the leftmost child and sibling the next node to the right. add
+  # and melding are O(1); pop is O(log n) amortized, using the two pass
+  # pairing of the root's children. Only the top is accessible, so there is
+  # no indexing.
+
+  def __init__(self, initial = []): # {{{
+    self.root = None
+    self.size = 0
+    for n in initial:
+      self.add(n)
+  #--------------------------------------------------------------------------}}}
+
+  def _meld(self, a, b): # {{{
+    # make the root with the larger key the leftmost child of the other
+    if b[0] < a[0]:
+      a, b = b, a
+    b[3] = a[2]
+    a[2] = b
+    return a
+  #--------------------------------------------------------------------------}}}
+
+  def add(self, new_node): # {{{
+    node = [new_node[0], new_node[1], None, None]
+    self.root = node if self.root is None else self._meld(self.root, node)
+    self.size += 1
+  #--------------------------------------------------------------------------}}}
+  def pop(self): # {{{
+    if self.root is None:
+      raise IndexError("pop from an empty heap")
+    top = self.root
+
+    # first pass: meld the children in pairs, left to right
+    pairs = []
+    child = top[2]
+    while child is not None:
+      second = child[3]
+      if second is None:
+        child[3] = None
+        pairs.append(child)
+        break
+      after = second[3]
+      child[3] = second[3] = None
+      pairs.append(self._meld(child, second))
+      child = after
+
+    # second pass: meld the pairs right to left
+    root = pairs.pop() if pairs else None
+    while pairs:
+      root = self._meld(pairs.pop(), root)
+
+    self.root = root
+    self.size -= 1
+    return (top[0], top[1])
+  #--------------------------------------------------------------------------}}}
+
+  def __len__(self): # {{{
+    return self.size
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+class RadixHeap: # {{{1
+  # A radix heap for non-negative integer keys that are used monotonically:
+  # a key may not be smaller than the last key popped (as in Dijkstra's
+  # algorithm). Node (k,v) is kept in bucket b = (k ^ last).bit_length(),
+  # where last is the last key popped, so bucket 0 holds the keys equal to
+  # last and bucket b > 0 the keys that first differ from last in bit b-1.
+  # pop empties the first nonempty bucket into lower ones, and each node can
+  # only move down, so add and pop are O(log C) amortized for keys below C.
+
   def __init__(self, initial = []): # {{{
-    self.elements = Heap(initial=initial)
+    self.last = 0
+    self.size = 0
+    self.buckets = [ [] for _ in range(65) ]
+    for n in initial:
+      self.add(n)
+  #--------------------------------------------------------------------------}}}
+
+  def add(self, new_node): # {{{
+    key = new_node[0]
+    if key < self.last:
+      raise ValueError("key %r is smaller than the last key popped" % (key,))
+    self.buckets[(key ^ self.last).bit_length()].append(new_node)
+    self.size += 1
+  #--------------------------------------------------------------------------}}}
+  def pop(self): # {{{
+    if self.size == 0:
+      raise IndexError("pop from an empty heap")
+    buckets = self.buckets
+    if not buckets[0]:
+      b = 1
+      while not buckets[b]:
+        b += 1
+      nodes = buckets[b]
+      buckets[b] = []
+      self.last = last = min(nodes)[0]
+      for node in nodes:
+        buckets[(node[0] ^ last).bit_length()].append(node)
+    self.size -= 1
+    return buckets[0].pop()
+  #--------------------------------------------------------------------------}}}
+
+  def __len__(self): # {{{
+    return self.size
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+def bench_heap(n = 10**5): # {{{
+  # Build a heap from n random nodes, then pop everything, with Heap,
+  # ArrayHeap and heapq.
+  nodes = [ (randrange(n), i) for i in range(n) ]
+
+  start = time.time()
+  H = Heap(nodes)
+  while len(H) != 0:
+    H.remove(0)
+  print "Heap:      %.3fs" % (time.time() - start)
+
+  start = time.time()
+  H = ArrayHeap(nodes)
+  while len(H) != 0:
+    H.pop()
+  print "ArrayHeap: %.3fs" % (time.time() - start)
+
+  start = time.time()
+  H = list(nodes)
+  heapq.heapify(H)
+  while len(H) != 0:
+    heapq.heappop(H)
+  print "heapq:     %.3fs" % (time.time() - start)
+#----------------------------------------------------------------------------}}}
+
+class PQ: # {{{1
+  # A priority queue on top of a heap. The heap is built by
+  # backend(initial, **options), and any class with add, pop (returning the
+  # (key,value) pair at the top) and __len__ works: Heap, ArrayHeap,
+  # DaryHeap (e.g. PQ(backend=DaryHeap, d=8)), PairingHeap or RadixHeap.
+
+  def __init__(self, initial = [], backend = Heap, **options): # {{{
+    self.elements = backend(initial, **options)
   #--------------------------------------------------------------------------}}}
 
   def add(self, new_node):  # {{{
@@ -156,20 +443,304 @@ class PQ: # {{{1
     # empty.
     if self.elements.__len__() == 0:
         raise IndexError
-    val = self.elements.nodes[0]
-    self.elements.__delitem__(0)
-    return val[1]
+    return self.elements.pop()[1]
 
   #--------------------------------------------------------------------------}}}
 
   def __len__(self):  # {{{
-    return len(self.hashes)
+    return len(self.elements)
   #--------------------------------------------------------------------------}}}
   def __str__(self):  # {{{
-    return str(self.nodes)
+    return str(self.elements)
   #--------------------------------------------------------------------------}}}
 #----------------------------------------------------------------------------}}}1
 
+class IndexedPQ: # {{{1
+  # A priority queue of distinct (hashable) values, with a binary heap stored
+  # like ArrayHeap plus a dictionary IndexedPQ.pos mapping every value to its
+  # index in the heap. The map is updated whenever a node moves, so a value
+  # can be found in O(1) and its key changed or the value removed in
+  # O(log n), without leaving stale duplicates in the heap.
+  #
+  # If Q is an IndexedPQ, then...
+  #   - Q.add((k,v)) adds v with key k; v must not be in Q yet
+  #   - Q.pop() removes and returns the value with the least key, as PQ.pop
+  #   - Q.peek() returns that value without removing it
+  #   - Q.decrease_key(v, k), Q.increase_key(v, k) and Q.update_key(v, k) set
+  #     the key of v to k; the first two check the direction
+  #   - Q.remove(v) removes v
+  #   - v in Q, Q.contains(v) test membership, and Q[v] is the key of v
+
+  def __init__(self, initial = []): # {{{
+    self.keys = [ k for (k,v) in initial ]
+    self.values = [ v for (k,v) in initial ]
+    self.pos = dict( (v, i) for (i, v) in enumerate(self.values) )
+    if len(self.pos) != len(self.values):
+      raise ValueError("values in an IndexedPQ must be distinct")
+    for index in range(len(self.keys)//2 - 1, -1, -1):
+      self._sift_down(index)
+  #--------------------------------------------------------------------------}}}
+
+  def _sift_up(self, index): # {{{
+    keys, values, pos = self.keys, self.values, self.pos
+    key, value = keys[index], values[index]
+    while index > 0:
+      parent = (index - 1) >> 1
+      if not key < keys[parent]:
+        break
+      keys[index], values[index] = keys[parent], values[parent]
+      pos[values[index]] = index
+      index = parent
+    keys[index], values[index] = key, value
+    pos[value] = index
+  #--------------------------------------------------------------------------}}}
+  def _sift_down(self, index): # {{{
+    keys, values, pos = self.keys, self.values, self.pos
+    n = len(keys)
+    key, value = keys[index], values[index]
+    child = 2*index + 1
+    while child < n:
+      if child + 1 < n and keys[child + 1] < keys[child]:
+        child += 1
+      if not keys[child] < key:
+        break
+      keys[index], values[index] = keys[child], values[child]
+      pos[values[index]] = index
+      index = child
+      child = 2*index + 1
+    keys[index], values[index] = key, value
+    pos[value] = index
+  #--------------------------------------------------------------------------}}}
+  def _remove_at(self, index): # {{{
+    del self.pos[self.values[index]]
+    last_key, last_value = self.keys.pop(), self.values.pop()
+    if index == len(self.keys):
+      return
+    self.keys[index], self.values[index] = last_key, last_value
+    self._sift_down(index)
+    self._sift_up(self.pos[last_value])
+  #--------------------------------------------------------------------------}}}
+
+  def add(self, new_node): # {{{
+    key, value = new_node
+    if value in self.pos:
+      raise KeyError("%r is already in the queue" % (value,))
+    self.keys.append(key)
+    self.values.append(value)
+    self._sift_up(len(self.keys) - 1)
+  #--------------------------------------------------------------------------}}}
+  def pop(self): # {{{
+    if len(self.keys) == 0:
+      raise IndexError
+    value = self.values[0]
+    self._remove_at(0)
+    return value
+  #--------------------------------------------------------------------------}}}
+  def peek(self): # {{{
+    if len(self.keys) == 0:
+      raise IndexError
+    return self.values[0]
+  #--------------------------------------------------------------------------}}}
+
+  def update_key(self, value, key): # {{{
+    index = self.pos[value]
+    old_key = self.keys[index]
+    self.keys[index] = key
+    if key < old_key:
+      self._sift_up(index)
+    else:
+      self._sift_down(index)
+  #--------------------------------------------------------------------------}}}
+  def decrease_key(self, value, key): # {{{
+    if self.keys[self.pos[value]] < key:
+      raise ValueError("new key is larger than the current key")
+    self.update_key(value, key)
+  #--------------------------------------------------------------------------}}}
+  def increase_key(self, value, key): # {{{
+    if key < self.keys[self.pos[value]]:
+      raise ValueError("new key is smaller than the current key")
+    self.update_key(value, key)
+  #--------------------------------------------------------------------------}}}
+  def remove(self, value): # {{{
+    self._remove_at(self.pos[value])
+  #--------------------------------------------------------------------------}}}
+
+  def contains(self, value): # {{{
+    return value in self.pos
+  #--------------------------------------------------------------------------}}}
+  def __contains__(self, value): # {{{
+    return value in self.pos
+  #--------------------------------------------------------------------------}}}
+  def __getitem__(self, value): # {{{
+    return self.keys[self.pos[value]]
+  #--------------------------------------------------------------------------}}}
+  def __len__(self): # {{{
+    return len(self.keys)
+  #--------------------------------------------------------------------------}}}
+  def __str__(self): # {{{
+    return str(zip(self.keys, self.values))
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+class ThreadSafePQ: # {{{1
+  # A PQ shared between threads. Every operation holds one lock, and pop can
+  # block until something is pushed:
+  #   - Q.push(node) and Q.push_many(nodes) add (key,value) pairs; push_many
+  #     takes the lock once for the whole list
+  #   - Q.pop(block = True, timeout = None) returns a value like PQ.pop. If the
+  #     queue stays empty (immediately when block is False, or after timeout
+  #     seconds), it raises IndexError.
+  #   - Q.pop_many(max_items, timeout = None) waits like pop for the first
+  #     value, then returns a list of up to max_items values in key order
+  # The backend and its options are passed on to PQ.
+
+  def __init__(self, initial = [], backend = ArrayHeap, **options): # {{{
+    self.queue = PQ(initial, backend=backend, **options)
+    self.not_empty = threading.Condition(threading.Lock())
+  #--------------------------------------------------------------------------}}}
+
+  def _wait(self, block, timeout): # {{{
+    # Called with the lock held; returns once the queue is nonempty.
+    if not block:
+      if len(self.queue) == 0:
+        raise IndexError
+      return
+    if timeout is None:
+      while len(self.queue) == 0:
+        self.not_empty.wait()
+      return
+    deadline = time.time() + timeout
+    while len(self.queue) == 0:
+      remaining = deadline - time.time()
+      if remaining <= 0:
+        raise IndexError
+      self.not_empty.wait(remaining)
+  #--------------------------------------------------------------------------}}}
+
+  def push(self, new_node): # {{{
+    with self.not_empty:
+      self.queue.add(new_node)
+      self.not_empty.notify()
+  #--------------------------------------------------------------------------}}}
+  def push_many(self, nodes): # {{{
+    with self.not_empty:
+      count = 0
+      for node in nodes:
+        self.queue.add(node)
+        count += 1
+      self.not_empty.notify(count)
+  #--------------------------------------------------------------------------}}}
+  def pop(self, block = True, timeout = None): # {{{
+    with self.not_empty:
+      self._wait(block, timeout)
+      return self.queue.pop()
+  #--------------------------------------------------------------------------}}}
+  def pop_many(self, max_items, block = True, timeout = None): # {{{
+    with self.not_empty:
+      self._wait(block, timeout)
+      count = min(max_items, len(self.queue))
+      return [ self.queue.pop() for _ in range(count) ]
+  #--------------------------------------------------------------------------}}}
+
+  def __len__(self): # {{{
+    with self.not_empty:
+      return len(self.queue)
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+class PQManager(BaseManager): # {{{1
+  # Serves ThreadSafePQ objects to other processes. The queue lives in the
+  # manager's server process, and the proxies pickle only the nodes pushed
+  # and the values popped:
+  #
+  #   manager = PQManager()
+  #   manager.start()
+  #   Q = manager.PQ()          # pass Q to worker processes
+  #   Q.push((key, value))
+  pass
+PQManager.register('PQ', ThreadSafePQ,
+                   exposed=['push', 'push_many', 'pop', 'pop_many', '__len__'])
+#----------------------------------------------------------------------------}}}1
+
+def bench_concurrent_pq(items = 10**5, producers = (1, 2, 4, 8, 16, 32), batch = 64): # {{{
+  # Push items nodes from each number of producer threads into one
+  # ThreadSafePQ, while a consumer thread drains it with pop_many. Runs once
+  # with single pushes and once with push_many in batches of batch nodes.
+  for batched in (False, True):
+    print "push_many, batch %d" % batch if batched else "push"
+    for num_producers in producers:
+      Q = ThreadSafePQ()
+      per_producer = items // num_producers
+      total = per_producer * num_producers
+
+      def produce(seed):
+        keys = [ randrange(items) for _ in xrange(per_producer) ]
+        if batched:
+          for start in xrange(0, per_producer, batch):
+            Q.push_many([ (k, seed) for k in keys[start:start + batch] ])
+        else:
+          for k in keys:
+            Q.push((k, seed))
+
+      def consume():
+        popped = 0
+        while popped < total:
+          popped += len(Q.pop_many(batch))
+
+      threads = [ threading.Thread(target=produce, args=(i,)) for i in range(num_producers) ]
+      consumer = threading.Thread(target=consume)
+      start = time.time()
+      consumer.start()
+      for t in threads:
+        t.start()
+      for t in threads:
+        t.join()
+      consumer.join()
+      elapsed = time.time() - start
+      print "  %2d producers: %10.0f items/s" % (num_producers, total / elapsed)
+#----------------------------------------------------------------------------}}}
+
+PQ_BACKENDS = [ ("Heap", Heap, {}),
+                ("ArrayHeap", ArrayHeap, {}),
+                ("DaryHeap d=4", DaryHeap, {"d": 4}),
+                ("DaryHeap d=8", DaryHeap, {"d": 8}),
+                ("PairingHeap", PairingHeap, {}),
+                ("RadixHeap", RadixHeap, {}) ]
+
+def _bench_backend(backend, options, keys, pops, results): # {{{
+  # Runs in a fresh process, so that ru_maxrss only measures this backend.
+  base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  Q = PQ(backend=backend, **options)
+  start = time.time()
+  for i, key in enumerate(keys):
+    Q.add((key, i))
+  push_time = time.time() - start
+  peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss
+  start = time.time()
+  for _ in xrange(pops):
+    Q.pop()
+  pop_time = time.time() - start
+  results.put((push_time, pop_time, peak_kb))
+#----------------------------------------------------------------------------}}}
+def bench_pq_backends(sizes = (10**6, 10**7), pop_fraction = 0.1, backends = PQ_BACKENDS): # {{{
+  # For each size n, push n random keys into a PQ with each backend, then pop
+  # pop_fraction*n of them. Reports pushes and pops per second, and the growth
+  # of the peak resident memory of the process while pushing.
+  for n in sizes:
+    keys = [ randrange(n) for _ in xrange(n) ]
+    pops = int(n * pop_fraction)
+    print "n = %d, %d pops" % (n, pops)
+    for name, backend, options in backends:
+      results = Queue()
+      worker = Process(target=_bench_backend,
+                       args=(backend, options, keys, pops, results))
+      worker.start()
+      push_time, pop_time, peak_kb = results.get()
+      worker.join()
+      print "  %-14s %10.0f push/s %10.0f pop/s %8.1f MB" % (
+        name, n / push_time, pops / pop_time if pops else 0, peak_kb / 1024)
+#----------------------------------------------------------------------------}}}
+
 I = [ (2,"b"),
       (15,"c"),
       (16,"d"),
@@ -202,19 +773,106 @@ print H
 # [(1, 'a'), (2, 'b'), (1, 'm'), (10, 'i'), (3, 'j'), (8, 'f'), (5, 'o'), (15, 'h'), (15, 'c'), (17, 'e'), (7, 'k'), (16, 'd'), (11, 'l'), (100, 'n'), (20, 'g')]
 
 
-def sort_with_PQ(L):  # {{{
+def sort_with_PQ(L, key = None):  # {{{
   # Input is a list L. Return the sorted list. The sort should be linear in the
   # PQ operations. That is, it should run in O(n*O(PQ)).
-    v_pq = PQ()
-    for elem in L:  
-        v_pq.add((elem, elem))
-    sortedList = []
-    count = 0
-    while count < len(L) - 1:
-        sortedList.append(v_pq.pop())
-        count += 1
-    sortedList.append(v_pq.elements[0][0])
-    return sortedList
+  #
+  # The queue is heapified from all of L at once, and key works like the key
+  # argument of sorted. Only the keys are ever compared; with a key function
+  # they are (key(elem), position), which makes the sort stable.
+  if key is None:
+    nodes = [ (elem, elem) for elem in L ]
+  else:
+    nodes = [ ((key(elem), i), elem) for (i, elem) in enumerate(L) ]
+  v_pq = PQ(nodes, backend=ArrayHeap)
+  return [ v_pq.pop() for _ in range(len(nodes)) ]
+#----------------------------------------------------------------------------}}}
+
+RUN_BATCH = 1024     # items per pickle in a spilled run
+
+def _write_run(items, tmpdir): # {{{
+  # Pickle the sorted list items to a new temporary file, in batches, and
+  # return the file's name.
+  fd, path = tempfile.mkstemp(suffix='.run', dir=tmpdir)
+  f = os.fdopen(fd, 'wb')
+  try:
+    for start in xrange(0, len(items), RUN_BATCH):
+      cPickle.dump(items[start:start + RUN_BATCH], f, cPickle.HIGHEST_PROTOCOL)
+  finally:
+    f.close()
+  return path
+#----------------------------------------------------------------------------}}}
+def _read_run(path): # {{{
+  f = open(path, 'rb')
+  try:
+    while True:
+      try:
+        batch = cPickle.load(f)
+      except EOFError:
+        return
+      for item in batch:
+        yield item
+  finally:
+    f.close()
+#----------------------------------------------------------------------------}}}
+
+def external_sort(iterable, key = None, run_size = 10**6, tmpdir = None):  # {{{
+  # Generate the items of iterable in sorted order, for inputs that do not fit
+  # in memory. The input is cut into runs of run_size items; each run is
+  # sorted and spilled to a temporary file. The runs are then merged through
+  # an ArrayHeap holding the next item of every run, so at most run_size items
+  # (while splitting) or one batch per run (while merging) are held. The sort
+  # is stable. The temporary files are deleted when the generator finishes or
+  # is closed.
+  if key is None:
+    key = lambda x: x
+  runs = []
+  try:
+    it = iter(iterable)
+    while True:
+      chunk = list(islice(it, run_size))
+      if not chunk:
+        break
+      chunk.sort(key=key)
+      runs.append(_write_run(chunk, tmpdir))
+      del chunk
+
+    # heap nodes are ((key, run), item); the run number keeps equal keys in
+    # input order
+    readers = [ _read_run(path) for path in runs ]
+    H = ArrayHeap()
+    for r, reader in enumerate(readers):
+      for item in reader:
+        H.add(((key(item), r), item))
+        break
+    while len(H) != 0:
+      (_, r), item = H[0]
+      yield item
+      for nxt in readers[r]:
+        H.replace(((key(nxt), r), nxt))
+        break
+      else:
+        H.pop()
+  finally:
+    for path in runs:
+      os.remove(path)
+#----------------------------------------------------------------------------}}}
+def top_k(iterable, k, key = None):  # {{{
+  # Return the k largest items of iterable, largest first, holding only k
+  # items at a time: a min-heap keeps the best k seen so far, and a new item
+  # replaces the top when it beats it. Ties keep the earlier item.
+  if k <= 0:
+    return []
+  H = ArrayHeap()
+  for i, item in enumerate(iterable):
+    node = ((item if key is None else key(item), -i), item)
+    if len(H) < k:
+      H.add(node)
+    elif H.keys[0] < node[0]:
+      H.replace(node)
+  result = [ H.pop()[1] for _ in range(len(H)) ]
+  result.reverse()
+  return result
 #----------------------------------------------------------------------------}}}
 
 # you can test your sort_with_PQ function like this:
@@ -222,3 +880,12 @@ R = [ randrange(20) for _ in range(15) ]
 print R
 print sort_with_PQ(R)
 
+
+# compare the heap implementations with heapq
+#bench_heap()
+
+# compare the PQ backends
+#bench_pq_backends()
+
+# measure lock contention on a shared queue
+#bench_concurrent_pq()
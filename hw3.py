@@ -1,8 +1,11 @@
 # imports {{{1
 from __future__ import division
+from array import array
+from bisect import bisect_left
 from collections import deque
 from copy import deepcopy
-from random import randrange
+from random import random, randrange
+import time
 #---------------------------------------------------------------------------}}}1
 
 class AdjList: # {{{1
@@ -12,6 +15,7 @@ class AdjList: # {{{1
 
   # AdjList.adj is the actual adjacency list.
   # AdjList.directed is a bool indicating whether the graph is directed.
+  # AdjList.index is None, or a list of neighbor sets (see build_index).
   # AdjList.nodes is an array of the form range(n).
 
   # Edges may be specified on initialization or with the add_edge method.
@@ -23,10 +27,13 @@ class AdjList: # {{{1
   #     explicity or implicityly convert A to a string (like with print).
   # These correspond to the last 3 class methods.
 
-  def __init__(self, num_nodes, edges = [], directed = False): # {{{
+  def __init__(self, num_nodes, edges = [], directed = False, indexed = False): # {{{
     self.nodes = range(num_nodes)
     self.adj = [ [] for _ in self.nodes ]
     self.directed = directed
+    self.index = None
+    if indexed:
+      self.build_index()
 
     for (s,t) in edges:
       self.add_edge(s,t)
@@ -36,8 +43,10 @@ class AdjList: # {{{1
 
   def add_edge(self, s, t, try_directed = True): # {{{
   # Adds an edge (s,t). If the graph is undirected, it adds edge (t,s) as well.
-    if t not in self.adj[s]:
+    if not self.has_edge(s, t):
       self.adj[s].append(t)
+      if self.index is not None:
+        self.index[s].add(t)
 
     if not self.directed and try_directed:
       self.add_edge(t, s, try_directed = False)
@@ -48,6 +57,8 @@ class AdjList: # {{{1
     try:
       t_index = self.adj[s].index(t)
       del self.adj[s][t_index]
+      if self.index is not None:
+        self.index[s].discard(t)
     except ValueError:
       pass
 
@@ -56,8 +67,20 @@ class AdjList: # {{{1
   #--------------------------------------------------------------------------}}}
 
   def has_edge(self, s, t): # {{{
+    if self.index is not None:
+      return t in self.index[s]
     return t in self.adj[s]
   #--------------------------------------------------------------------------}}}
+  def build_index(self): # {{{
+    # Keep a set of out-neighbors next to each adjacency list, so has_edge
+    # and the duplicate check in add_edge are O(1) instead of a scan of
+    # adj[s]. add_edge and del_edge keep it in sync; edits made directly to
+    # adj need a fresh build_index().
+    self.index = [ set(neighbors) for neighbors in self.adj ]
+  #--------------------------------------------------------------------------}}}
+  def drop_index(self): # {{{
+    self.index = None
+  #--------------------------------------------------------------------------}}}
   def degree(self, s): # {{{
     # return the degree of the node s
     deg = 0
@@ -86,10 +109,173 @@ class AdjList: # {{{1
   #--------------------------------------------------------------------------}}}
 #----------------------------------------------------------------------------}}}1
 
+class _CSRRows: # {{{1
+  # The rows of a compressed sparse row structure: row u is
+  # targets[offsets[u]:offsets[u+1]]. Used for CSRGraph.adj and CSRGraph.rev.
+
+  def __init__(self, offsets, targets): # {{{
+    self.offsets = offsets
+    self.targets = targets
+  #--------------------------------------------------------------------------}}}
+
+  def __getitem__(self, node): # {{{
+    return self.targets[self.offsets[node]:self.offsets[node+1]]
+  #--------------------------------------------------------------------------}}}
+
+  def __len__(self): # {{{
+    return len(self.offsets) - 1
+  #--------------------------------------------------------------------------}}}
+
+  def __iter__(self): # {{{
+    for node in xrange(len(self)):
+      yield self[node]
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+def _csr_arrays(num_nodes, keys): # {{{
+  # keys is a sorted list of distinct edge keys s*num_nodes + t. Return the
+  # arrays offsets, targets of the CSR structure.
+  offsets = array('l', [0]) * (num_nodes + 1)
+  targets = array('l', [0]) * len(keys)
+  for i, key in enumerate(keys):
+    s, targets[i] = divmod(key, num_nodes)
+    offsets[s+1] += 1
+  for u in xrange(num_nodes):
+    offsets[u+1] += offsets[u]
+  return offsets, targets
+#----------------------------------------------------------------------------}}}
+
+class CSRGraph: # {{{1
+  # An immutable graph in compressed sparse row form, for graphs too big for
+  # AdjList. The out-neighbours of u are CSRGraph.targets[offsets[u]:
+  # offsets[u+1]], sorted, and the reverse graph is stored the same way in
+  # CSRGraph.rev_offsets and CSRGraph.rev_targets. All four are flat arrays,
+  # built in one pass over the edge list: the edges are encoded as integers
+  # s*num_nodes + t, deduplicated and sorted together, and counted into rows.
+  #
+  # CSRGraph has the read-only interface of AdjList, so functions written
+  # for AdjList run on it unchanged:
+  #   - G[u] (or G.adj[u]) is the sorted adjacency list of u, and G.rev[u]
+  #     the one of the reverse graph
+  #   - len(G) is the number of nodes and G.nodes is range(len(G))
+  #   - G.has_edge(s, t) is a binary search, O(log deg)
+  #   - G.in_degree(s), G.out_degree(s) and G.degree(s) are O(1)
+  # CSRGraph.from_adjlist(A) converts an AdjList.
+
+  def __init__(self, num_nodes, edges = [], directed = False): # {{{
+    self.nodes = xrange(num_nodes)
+    self.directed = directed
+
+    keys = set()
+    for (s, t) in edges:
+      keys.add(s*num_nodes + t)
+      if not directed:
+        keys.add(t*num_nodes + s)
+    keys = sorted(keys)
+    self.offsets, self.targets = _csr_arrays(num_nodes, keys)
+    if directed:
+      keys = sorted((key % num_nodes)*num_nodes + key // num_nodes
+             for key in keys)
+      self.rev_offsets, self.rev_targets = _csr_arrays(num_nodes, keys)
+    else:
+      self.rev_offsets, self.rev_targets = self.offsets, self.targets
+    del keys
+
+    self.adj = _CSRRows(self.offsets, self.targets)
+    self.rev = _CSRRows(self.rev_offsets, self.rev_targets)
+  #--------------------------------------------------------------------------}}}
+
+  @classmethod
+  def from_adjlist(cls, A): # {{{
+    edges = ((s, t) for s in A.nodes for t in A.adj[s])
+    return cls(len(A), edges, directed=A.directed)
+  #--------------------------------------------------------------------------}}}
+
+  def num_edges(self): # {{{
+    # number of entries in the adjacency lists; an undirected edge counts
+    # twice, as in AdjList
+    return len(self.targets)
+  #--------------------------------------------------------------------------}}}
+
+  def has_edge(self, s, t): # {{{
+    hi = self.offsets[s+1]
+    i = bisect_left(self.targets, t, self.offsets[s], hi)
+    return i < hi and self.targets[i] == t
+  #--------------------------------------------------------------------------}}}
+
+  def has_edge_rev(self, s, t): # {{{
+    hi = self.rev_offsets[s+1]
+    i = bisect_left(self.rev_targets, t, self.rev_offsets[s], hi)
+    return i < hi and self.rev_targets[i] == t
+  #--------------------------------------------------------------------------}}}
+
+  def is_path(self, path): # {{{
+    if not path:    # if path is [] or None
+      return False
+
+    for i in range(1, len(path)):
+      if not self.has_edge(path[i-1], path[i]):
+        return False
+    return True
+  #--------------------------------------------------------------------------}}}
+
+  def is_cycle(self, path): # {{{
+    # in an undirected graph 1-cycles don't count
+    if not self.directed and len(path) == 2:
+      return False
+
+    return self.is_path(list(path) + [path[0]])
+  #--------------------------------------------------------------------------}}}
+
+  def in_degree(self, s): # {{{
+    return self.rev_offsets[s+1] - self.rev_offsets[s]
+  #--------------------------------------------------------------------------}}}
+
+  def out_degree(self, s): # {{{
+    return self.offsets[s+1] - self.offsets[s]
+  #--------------------------------------------------------------------------}}}
+
+  def degree(self, s): # {{{
+    # the length of the adjacency list, as in AdjList.degree
+    return self.out_degree(s)
+  #--------------------------------------------------------------------------}}}
+
+  def sort(self): # {{{
+    # the rows are always sorted
+    pass
+  #--------------------------------------------------------------------------}}}
+
+  def reverse(self): # {{{
+    # returns reverse graph, sharing the arrays of this one
+    rev_graph = CSRGraph(0, directed=self.directed)
+    rev_graph.nodes = self.nodes
+    rev_graph.offsets, rev_graph.targets = self.rev_offsets, self.rev_targets
+    rev_graph.rev_offsets, rev_graph.rev_targets = self.offsets, self.targets
+    rev_graph.adj, rev_graph.rev = self.rev, self.adj
+    return rev_graph
+  #--------------------------------------------------------------------------}}}
+
+  def __getitem__(self, node): # {{{
+    return self.targets[self.offsets[node]:self.offsets[node+1]]
+  #--------------------------------------------------------------------------}}}
+
+  def __len__(self): # {{{
+    return len(self.nodes)
+  #--------------------------------------------------------------------------}}}
+
+  def __str__(self): # {{{
+    ret = ""
+    for n in self.nodes:
+      neighbors = [str(i) for i in self[n]]
+      ret += str(n) + ": " + " ".join(neighbors) + "\n"
+    return ret[:-1]
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
 def randgraph(num_nodes):  # {{{
   num_edges = int( num_nodes*2**0.5 )
 
-  G = AdjList(num_nodes)
+  G = AdjList(num_nodes, indexed=True)
   for _ in xrange(num_edges):
     new_edge = (randrange(num_nodes), randrange(num_nodes))
     if not G.has_edge( *new_edge ):
@@ -98,6 +284,41 @@ def randgraph(num_nodes):  # {{{
   return G
 #----------------------------------------------------------------------------}}}
 
+def rand_powerlaw_edges(num_nodes, num_edges, exponent = 2.1): # {{{
+  # Random edges whose endpoints are drawn with weight (i+1)**(-1/(exponent-1))
+  # (Chung-Lu), so degrees follow a power law: node 0 is a hub with degree
+  # ~num_edges**(1/(exponent-1)) and most nodes have degree 1 or 2.
+  cumulative = []
+  total = 0.0
+  for i in xrange(num_nodes):
+    total += (i + 1)**(-1/(exponent - 1))
+    cumulative.append(total)
+
+  def endpoint():
+    return min(bisect_left(cumulative, random()*total), num_nodes - 1)
+
+  return [ (endpoint(), endpoint()) for _ in xrange(num_edges) ]
+#----------------------------------------------------------------------------}}}
+
+def bench_edge_index(sizes = (10**3, 10**4, 10**5)): # {{{
+  # Build AdjLists from power-law edge lists with and without the hashed edge
+  # index, and check both give the same graph.
+  for n in sizes:
+    edges = rand_powerlaw_edges(n, 4*n)
+
+    start = time.time()
+    A = AdjList(n, edges)
+    plain = time.time() - start
+
+    start = time.time()
+    B = AdjList(n, edges, indexed = True)
+    indexed = time.time() - start
+
+    assert A.adj == B.adj
+    print "n=%-7d max degree %-6d plain: %7.3fs  indexed: %7.3fs" % (
+        n, max(A.degree(u) for u in A.nodes), plain, indexed)
+#----------------------------------------------------------------------------}}}
+
 def BFS(G, s):  # {{{
   # Breadth First search for G and s. Returns a BFS tree rooted at s. The data
   # structure deque is used. It is something like a symmetric queue, with O(1)
@@ -123,6 +344,209 @@ def BFS(G, s):  # {{{
   return BFS_Tree, dist
 #----------------------------------------------------------------------------}}}
 
+def _in_neighbors(G): # {{{
+  # In-neighbor lists for the bottom-up steps of BFS_hybrid: G.rev when G
+  # keeps one (CSRGraph), G.adj when G is undirected, and otherwise a reverse
+  # built here in O(V+E).
+  if hasattr(G, 'rev'):
+    return G.rev
+  if not G.directed:
+    return G.adj
+  rev = [ [] for _ in G.nodes ]
+  for u in G.nodes:
+    for v in G[u]:
+      rev[v].append(u)
+  return rev
+#----------------------------------------------------------------------------}}}
+
+def BFS_hybrid(G, s, alpha = 14, beta = 24): # {{{
+  # Direction-optimizing BFS (Beamer, Asanovic and Patterson). Works on an
+  # AdjList or a CSRGraph and returns arrays parent, dist instead of a tree:
+  # parent[s] = s, parent[v] is the node v was discovered from, and both are
+  # -1 for nodes not reachable from s. dist is the same as BFS(G, s)[1].
+  #
+  # Each level is expanded either top-down (every frontier node scans its
+  # out-neighbors) or bottom-up (every unvisited node scans its in-neighbors,
+  # from G.rev, and stops at the first one in the frontier). Bottom-up wins
+  # in the big middle levels, where most edges out of the frontier lead to
+  # nodes already seen. The switch is Beamer's heuristic: go bottom-up once
+  # the frontier has more than 1/alpha of the unexplored edges, and back to
+  # top-down once it holds fewer than 1/beta of the nodes. The visited set and
+  # the frontier are byte-per-node flags (bytearray), not Python lists.
+  n = len(G)
+  rev = _in_neighbors(G)
+  if isinstance(G, CSRGraph):
+    offsets = G.offsets
+    out_degree = [ offsets[u+1] - offsets[u] for u in G.nodes ]
+  else:
+    out_degree = [ len(G[u]) for u in G.nodes ]
+  parent = array('l', [-1]) * n
+  dist = array('l', [-1]) * n
+  seen = bytearray(n)
+  parent[s] = s
+  dist[s] = 0
+  seen[s] = 1
+
+  frontier = [s]
+  unvisited = G.nodes
+  unexplored_edges = sum(out_degree) - out_degree[s]
+  bottom_up = False
+  level = 0
+  while frontier:
+    level += 1
+    frontier_edges = sum(out_degree[u] for u in frontier)
+    if not bottom_up and frontier_edges > unexplored_edges / alpha:
+      bottom_up = True
+    elif bottom_up and len(frontier) < n / beta:
+      bottom_up = False
+
+    next_frontier = []
+    if bottom_up:
+      in_frontier = bytearray(n)
+      for u in frontier:
+        in_frontier[u] = 1
+      unvisited = [ v for v in unvisited if not seen[v] ]
+      for v in unvisited:
+        for u in rev[v]:
+          if in_frontier[u]:
+            seen[v] = 1
+            parent[v] = u
+            dist[v] = level
+            next_frontier.append(v)
+            break
+    else:
+      for u in frontier:
+        for v in G[u]:
+          if not seen[v]:
+            seen[v] = 1
+            parent[v] = u
+            dist[v] = level
+            next_frontier.append(v)
+
+    unexplored_edges -= sum(out_degree[v] for v in next_frontier)
+    frontier = next_frontier
+
+  return parent, dist
+#----------------------------------------------------------------------------}}}
+
+def bench_BFS_hybrid(num_nodes = 10**5, avg_degree = 16): # {{{
+  # Compare BFS and BFS_hybrid on randgraph(num_nodes) and on a denser random
+  # CSRGraph with about avg_degree neighbors per node.
+  graphs = [ ("randgraph", randgraph(num_nodes)) ]
+  edges = [ (randrange(num_nodes), randrange(num_nodes))
+            for _ in xrange(num_nodes*avg_degree//2) ]
+  graphs.append(("degree %d" % avg_degree, CSRGraph(num_nodes, edges)))
+
+  for name, G in graphs:
+    start = time.time()
+    dist = BFS(G, 0)[1]
+    plain = time.time() - start
+
+    start = time.time()
+    hybrid_dist = BFS_hybrid(G, 0)[1]
+    hybrid = time.time() - start
+
+    assert list(hybrid_dist) == dist
+    print "%-10s BFS: %.3fs  BFS_hybrid: %.3fs" % (name, plain, hybrid)
+#----------------------------------------------------------------------------}}}
+
+# The number of roots BFS_multi runs at once: one bit per root in a machine
+# word per node, so as many as an array('L') item has bits (64 on most 64-bit
+# Unix builds, 32 on Windows and 32-bit builds).
+MSBFS_WIDTH = 8 * array('L').itemsize
+
+def BFS_multi(G, sources): # {{{
+  # Multi-source BFS (MS-BFS, Then et al.): the distances from up to
+  # MSBFS_WIDTH roots in one traversal. Bit i of seen[v] says that root
+  # sources[i] has reached v, and bit i of visit[v] that v is in the frontier
+  # of root i. A level ORs the visit word of each frontier node into its
+  # neighbors, so one scan of an edge serves every root whose frontier holds
+  # its tail, and nodes reached by many roots at the same level are expanded
+  # once. Returns a list of len(sources) arrays, the i-th one equal to
+  # BFS(G, sources[i])[1].
+  if len(sources) > MSBFS_WIDTH:
+    raise ValueError("at most %d sources at once" % MSBFS_WIDTH)
+  n = len(G)
+  seen = array('L', [0]) * n
+  visit = array('L', [0]) * n
+  visit_next = array('L', [0]) * n
+  dist = [ array('l', [-1]) * n for _ in sources ]
+  for i, s in enumerate(sources):
+    seen[s] |= 1 << i
+    visit[s] |= 1 << i
+    dist[i][s] = 0
+
+  frontier = sorted(set(sources))
+  level = 0
+  while frontier:
+    level += 1
+    reached = []
+    for u in frontier:
+      bits = visit[u]
+      visit[u] = 0
+      for v in G[u]:
+        new = bits & ~seen[v]
+        if new:
+          if not visit_next[v]:
+            reached.append(v)
+          visit_next[v] |= new
+
+    for v in reached:
+      new = visit_next[v]
+      visit_next[v] = 0
+      seen[v] |= new
+      visit[v] = new
+      while new:
+        low = new & -new
+        dist[low.bit_length() - 1][v] = level
+        new ^= low
+    frontier = reached
+
+  return dist
+#----------------------------------------------------------------------------}}}
+
+def BFS_matrix(G, sources = None, out = None): # {{{
+  # Distances from every node in sources (default: all of G.nodes), computed
+  # MSBFS_WIDTH roots at a time with BFS_multi. Row i of the result holds the
+  # distances from sources[i], with -1 for unreachable nodes. out may be a
+  # preallocated NumPy array of shape (len(sources), len(G)), for example a
+  # np.memmap, and is filled in place; otherwise an int64 array is made.
+  import numpy as np
+
+  if sources is None:
+    sources = G.nodes
+  sources = list(sources)
+  if out is None:
+    out = np.empty((len(sources), len(G)), dtype=np.int64)
+  elif out.shape != (len(sources), len(G)):
+    raise ValueError("out must have shape (%d, %d)" % (len(sources), len(G)))
+
+  for lo in xrange(0, len(sources), MSBFS_WIDTH):
+    batch = sources[lo:lo + MSBFS_WIDTH]
+    for i, row in enumerate(BFS_multi(G, batch)):
+      out[lo + i] = np.frombuffer(row, dtype=np.int_)
+  return out
+#----------------------------------------------------------------------------}}}
+
+def bench_BFS_multi(num_nodes = 10**4, avg_degree = 8, num_sources = MSBFS_WIDTH): # {{{
+  # Distances from num_sources roots of a random CSRGraph, with one BFS per
+  # root and with BFS_multi.
+  edges = [ (randrange(num_nodes), randrange(num_nodes))
+            for _ in xrange(num_nodes*avg_degree//2) ]
+  G = CSRGraph(num_nodes, edges)
+  sources = [ randrange(num_nodes) for _ in xrange(num_sources) ]
+
+  start = time.time()
+  single = [ BFS(G, s)[1] for s in sources ]
+  print "BFS per root: %.3fs" % (time.time() - start)
+
+  start = time.time()
+  multi = BFS_multi(G, sources)
+  print "BFS_multi:    %.3fs" % (time.time() - start)
+
+  assert [ list(d) for d in multi ] == single
+#----------------------------------------------------------------------------}}}
+
 def DFS(G,s): # {{{
   # G is an AdjList representation of a graph and s is a node in the graph.
   # Return the Depth First Search tree for G and s.
@@ -150,6 +574,109 @@ def DFS(G,s): # {{{
   
 #----------------------------------------------------------------------------}}}
 
+def DFS_events(G, s = None): # {{{
+  # Iterative depth first search as a generator of events (kind, u, v), in the
+  # order a recursive DFS would produce them:
+  #   - ('pre', u, v): v is discovered from u along a tree edge (u is -1 for
+  #     the root of a DFS tree)
+  #   - ('post', u, v): v is finished; u is its parent as in 'pre'
+  #   - ('back', u, v), ('forward', u, v), ('cross', u, v): a non-tree edge
+  #     from u to v. In an undirected graph every non-tree edge is reported
+  #     once, as a back edge, and the edge to the parent is not reported.
+  # With s given, only the DFS tree of s is visited; otherwise every node is,
+  # in order. The stack holds one [node, next index] entry per node on the
+  # current path, so memory is O(V) however many edges there are, and nothing
+  # is built that the caller does not ask for. For a CSRGraph the index points
+  # into G.targets, since G[u] would copy the row. Counting the events from 0
+  # gives the discovery and finish times (see DFS_times).
+  csr = isinstance(G, CSRGraph)
+  if csr:
+    offsets, targets = G.offsets, G.targets
+  n = len(G)
+  state = bytearray(n)   # 0 unseen, 1 on the stack, 2 finished
+  disc = array('l', [-1]) * n
+  parent = array('l', [-1]) * n
+  clock = 0
+  roots = G.nodes if s is None else [s]
+  for root in roots:
+    if state[root]:
+      continue
+    state[root] = 1
+    disc[root] = clock
+    clock += 1
+    yield ('pre', -1, root)
+    stack = [ [root, offsets[root] if csr else 0] ]
+    while stack:
+      top = stack[-1]
+      u, i = top
+      if csr:
+        neighbors, end = targets, offsets[u+1]
+      else:
+        neighbors = G[u]
+        end = len(neighbors)
+      descended = False
+      while i < end:
+        v = neighbors[i]
+        i += 1
+        if not state[v]:
+          top[1] = i
+          state[v] = 1
+          parent[v] = u
+          disc[v] = clock
+          clock += 1
+          yield ('pre', u, v)
+          stack.append([v, offsets[v] if csr else 0])
+          descended = True
+          break
+        if G.directed:
+          if state[v] == 1:
+            yield ('back', u, v)
+          elif disc[u] < disc[v]:
+            yield ('forward', u, v)
+          else:
+            yield ('cross', u, v)
+        elif state[v] == 1 and v != parent[u]:
+          yield ('back', u, v)
+
+      if not descended:
+        stack.pop()
+        state[u] = 2
+        clock += 1
+        yield ('post', parent[u], u)
+#----------------------------------------------------------------------------}}}
+
+def DFS_times(G, s = None): # {{{
+  # Discovery and finish times of a DFS (as in DFS_events), as arrays with -1
+  # for nodes that were not visited.
+  discovery = array('l', [-1]) * len(G)
+  finish = array('l', [-1]) * len(G)
+  clock = 0
+  for kind, _, v in DFS_events(G, s):
+    if kind == 'pre':
+      discovery[v] = clock
+      clock += 1
+    elif kind == 'post':
+      finish[v] = clock
+      clock += 1
+  return discovery, finish
+#----------------------------------------------------------------------------}}}
+
+def bench_DFS(num_nodes = 10**5, avg_degree = 8): # {{{
+  # Time DFS and a full pass over DFS_events on a random CSRGraph.
+  edges = [ (randrange(num_nodes), randrange(num_nodes))
+            for _ in xrange(num_nodes*avg_degree//2) ]
+  G = CSRGraph(num_nodes, edges)
+
+  start = time.time()
+  DFS(G, 0)
+  print "DFS:        %.3fs" % (time.time() - start)
+
+  start = time.time()
+  for _ in DFS_events(G, 0):
+    pass
+  print "DFS_events: %.3fs" % (time.time() - start)
+#----------------------------------------------------------------------------}}}
+
 
 testGraph = randgraph(10)
 print(testGraph)
@@ -158,4 +685,17 @@ tree1 = DFS(testGraph, 0)
 tree2 = DFS(testGraph, 4)
 print(tree1)
 print '\n\nreturned tree1 from Node 0\n\n'
-print(tree2)
\ No newline at end of file
+print(tree2)
+
+
+# compare AdjList construction with and without the edge index
+#bench_edge_index()
+
+# compare BFS with the direction-optimizing BFS_hybrid
+#bench_BFS_hybrid()
+
+# compare one BFS per root with the bit-parallel BFS_multi
+#bench_BFS_multi()
+
+# compare DFS with the iterative DFS_events engine
+#bench_DFS()
@@ -1,8 +1,16 @@
 # imports {{{1
 from __future__ import division
+from array import array
+from bisect import bisect_left
 from copy import deepcopy
+import mmap
+from multiprocessing import Pool, cpu_count
+from multiprocessing.sharedctypes import RawArray
+import os
 from random import randrange
+import struct
 from sys import *
+import time
 from collections import deque
 # ---------------------------------------------------------------------------}}}1
 
@@ -15,6 +23,7 @@ class AdjList:  # {{{1
     # AdjList.adj is the actual adjacency list.
     # AdjList.rev is the adjacency list of the reverse graph
     # AdjList.directed is a bool indicating whether the graph is directed.
+    # AdjList.index is None, or a list of neighbor sets (see build_index).
     # AdjList.nodes is an array of the form range(n).
 
     # Edges may be specified on initialization or with the add_edge method.
@@ -26,11 +35,14 @@ class AdjList:  # {{{1
     #     explicity or implicityly convert A to a string (like with print).
     # These correspond to the last 3 class methods.
 
-    def __init__(self, num_nodes, edges=[], directed=False):  # {{{
+    def __init__(self, num_nodes, edges=[], directed=False, indexed=False):  # {{{
         self.nodes = range(num_nodes)
         self.adj = [[] for _ in self.nodes]
         self.rev = [[] for _ in self.nodes]
         self.directed = directed
+        self.index = None
+        if indexed:
+            self.build_index()
 
         for (s, t) in edges:
             self.add_edge(s, t)
@@ -40,9 +52,11 @@ class AdjList:  # {{{1
 
     def add_edge(self, s, t, try_directed=True):  # {{{
         # Adds an edge (s,t). If the graph is undirected, it adds edge (t,s) as well.
-        if t not in self.adj[s]:
+        if not self.has_edge(s, t):
             self.adj[s].append(t)
             self.rev[t].append(s)
+            if self.index is not None:
+                self.index[s].add(t)
 
         if not self.directed and try_directed:
             self.add_edge(t, s, try_directed=False)
@@ -55,7 +69,9 @@ class AdjList:  # {{{1
             t_index = self.adj[s].index(t)
             del self.adj[s][t_index]
             s_index = self.rev[t].index(s)
-            del self.adj[t][s_index]
+            del self.rev[t][s_index]
+            if self.index is not None:
+                self.index[s].discard(t)
         except ValueError:
             pass
 
@@ -64,13 +80,29 @@ class AdjList:  # {{{1
     # --------------------------------------------------------------------------}}}
 
     def has_edge(self, s, t):  # {{{
+        if self.index is not None:
+            return t in self.index[s]
         return t in self.adj[s]
     # --------------------------------------------------------------------------}}}
 
     def has_edge_rev(self, s, t):  # {{{
+        if self.index is not None:
+            return s in self.index[t]
         return t in self.rev[s]
     # --------------------------------------------------------------------------}}}
 
+    def build_index(self):  # {{{
+        # Keep a set of out-neighbors next to each adjacency list, so has_edge
+        # and the duplicate check in add_edge are O(1) instead of a scan of
+        # adj[s]. add_edge and del_edge keep it in sync; edits made directly to
+        # adj need a fresh build_index().
+        self.index = [set(neighbors) for neighbors in self.adj]
+    # --------------------------------------------------------------------------}}}
+
+    def drop_index(self):  # {{{
+        self.index = None
+    # --------------------------------------------------------------------------}}}
+
     def degree(self, s):  # {{{
         if not self.directed:
             return len(self.adj[s])
@@ -89,9 +121,12 @@ class AdjList:  # {{{1
 
     def reverse(self):  # {{{
         # returns reverse graph
-        rev_adjlist = AdjList(self.numnodes, directed=self.directed)
-        rev_adjlist.adj = deepcopy(self.adj)
-        rev_adjlist.rev = deepcopy(self.rev)
+        rev_adjlist = AdjList(len(self.nodes), directed=self.directed)
+        rev_adjlist.adj = deepcopy(self.rev)
+        rev_adjlist.rev = deepcopy(self.adj)
+
+        if self.index is not None:
+            rev_adjlist.build_index()
 
         return rev_adjlist
     # --------------------------------------------------------------------------}}}
@@ -114,6 +149,402 @@ class AdjList:  # {{{1
 # ----------------------------------------------------------------------------}}}1
 
 
+class _CSRRows:  # {{{1
+    # The rows of a compressed sparse row structure: row u is
+    # targets[offsets[u]:offsets[u+1]]. Used for CSRGraph.adj and CSRGraph.rev.
+
+    def __init__(self, offsets, targets):  # {{{
+        self.offsets = offsets
+        self.targets = targets
+    # --------------------------------------------------------------------------}}}
+
+    def __getitem__(self, node):  # {{{
+        return self.targets[self.offsets[node]:self.offsets[node+1]]
+    # --------------------------------------------------------------------------}}}
+
+    def __len__(self):  # {{{
+        return len(self.offsets) - 1
+    # --------------------------------------------------------------------------}}}
+
+    def __iter__(self):  # {{{
+        for node in xrange(len(self)):
+            yield self[node]
+    # --------------------------------------------------------------------------}}}
+# ----------------------------------------------------------------------------}}}1
+
+
+def _csr_arrays(num_nodes, keys):  # {{{
+    # keys is a sorted list of distinct edge keys s*num_nodes + t. Return the
+    # arrays offsets, targets of the CSR structure.
+    offsets = array('l', [0]) * (num_nodes + 1)
+    targets = array('l', [0]) * len(keys)
+    for i, key in enumerate(keys):
+        s, targets[i] = divmod(key, num_nodes)
+        offsets[s+1] += 1
+    for u in xrange(num_nodes):
+        offsets[u+1] += offsets[u]
+    return offsets, targets
+# ----------------------------------------------------------------------------}}}
+
+
+class CSRGraph:  # {{{1
+    # An immutable graph in compressed sparse row form, for graphs too big for
+    # AdjList. The out-neighbours of u are CSRGraph.targets[offsets[u]:
+    # offsets[u+1]], sorted, and the reverse graph is stored the same way in
+    # CSRGraph.rev_offsets and CSRGraph.rev_targets. All four are flat arrays,
+    # built in one pass over the edge list: the edges are encoded as integers
+    # s*num_nodes + t, deduplicated and sorted together, and counted into rows.
+    #
+    # CSRGraph has the read-only interface of AdjList, so functions written
+    # for AdjList run on it unchanged:
+    #   - G[u] (or G.adj[u]) is the sorted adjacency list of u, and G.rev[u]
+    #     the one of the reverse graph
+    #   - len(G) is the number of nodes and G.nodes is range(len(G))
+    #   - G.has_edge(s, t) is a binary search, O(log deg)
+    #   - G.in_degree(s), G.out_degree(s) and G.degree(s) are O(1)
+    # CSRGraph.from_adjlist(A) converts an AdjList. Graphs made by load_edges or
+    # open_graph hold NumPy arrays instead, and may carry G.weights, an array
+    # of edge weights aligned with G.targets (None when unweighted).
+
+    def __init__(self, num_nodes, edges=[], directed=False):  # {{{
+        self.nodes = xrange(num_nodes)
+        self.directed = directed
+        self.weights = None
+
+        keys = set()
+        for (s, t) in edges:
+            keys.add(s*num_nodes + t)
+            if not directed:
+                keys.add(t*num_nodes + s)
+        keys = sorted(keys)
+        self.offsets, self.targets = _csr_arrays(num_nodes, keys)
+        if directed:
+            keys = sorted((key % num_nodes)*num_nodes + key // num_nodes
+                          for key in keys)
+            self.rev_offsets, self.rev_targets = _csr_arrays(num_nodes, keys)
+        else:
+            self.rev_offsets, self.rev_targets = self.offsets, self.targets
+        del keys
+
+        self.adj = _CSRRows(self.offsets, self.targets)
+        self.rev = _CSRRows(self.rev_offsets, self.rev_targets)
+    # --------------------------------------------------------------------------}}}
+
+    @classmethod
+    def from_adjlist(cls, A):  # {{{
+        edges = ((s, t) for s in A.nodes for t in A.adj[s])
+        return cls(len(A), edges, directed=A.directed)
+    # --------------------------------------------------------------------------}}}
+
+    @classmethod
+    def from_arrays(cls, offsets, targets, rev_offsets=None, rev_targets=None,
+                    directed=False, weights=None):  # {{{
+        # Wrap existing CSR arrays without copying them. A directed graph needs
+        # the reverse arrays as well; an undirected one shares the forward ones.
+        if directed and (rev_offsets is None or rev_targets is None):
+            raise ValueError("a directed graph needs rev_offsets and rev_targets")
+        G = cls(0, directed=directed)
+        G.nodes = xrange(len(offsets) - 1)
+        G.offsets, G.targets = offsets, targets
+        if directed:
+            G.rev_offsets, G.rev_targets = rev_offsets, rev_targets
+        else:
+            G.rev_offsets, G.rev_targets = offsets, targets
+        G.adj = _CSRRows(G.offsets, G.targets)
+        G.rev = _CSRRows(G.rev_offsets, G.rev_targets)
+        G.weights = weights
+        return G
+    # --------------------------------------------------------------------------}}}
+
+    def num_edges(self):  # {{{
+        # number of entries in the adjacency lists; an undirected edge counts
+        # twice, as in AdjList
+        return len(self.targets)
+    # --------------------------------------------------------------------------}}}
+
+    def has_edge(self, s, t):  # {{{
+        hi = self.offsets[s+1]
+        i = bisect_left(self.targets, t, self.offsets[s], hi)
+        return i < hi and self.targets[i] == t
+    # --------------------------------------------------------------------------}}}
+
+    def has_edge_rev(self, s, t):  # {{{
+        hi = self.rev_offsets[s+1]
+        i = bisect_left(self.rev_targets, t, self.rev_offsets[s], hi)
+        return i < hi and self.rev_targets[i] == t
+    # --------------------------------------------------------------------------}}}
+
+    def is_path(self, path):  # {{{
+        if not path:    # if path is [] or None
+            return False
+
+        for i in range(1, len(path)):
+            if not self.has_edge(path[i-1], path[i]):
+                return False
+        return True
+    # --------------------------------------------------------------------------}}}
+
+    def is_cycle(self, path):  # {{{
+        # in an undirected graph 1-cycles don't count
+        if not self.directed and len(path) == 2:
+            return False
+
+        return self.is_path(list(path) + [path[0]])
+    # --------------------------------------------------------------------------}}}
+
+    def in_degree(self, s):  # {{{
+        return self.rev_offsets[s+1] - self.rev_offsets[s]
+    # --------------------------------------------------------------------------}}}
+
+    def out_degree(self, s):  # {{{
+        return self.offsets[s+1] - self.offsets[s]
+    # --------------------------------------------------------------------------}}}
+
+    def degree(self, s):  # {{{
+        if not self.directed:
+            return self.out_degree(s)
+
+        return self.out_degree(s) + self.in_degree(s)
+    # --------------------------------------------------------------------------}}}
+
+    def sort(self):  # {{{
+        # the rows are always sorted
+        pass
+    # --------------------------------------------------------------------------}}}
+
+    def reverse(self):  # {{{
+        # returns reverse graph, sharing the arrays of this one
+        rev_graph = CSRGraph(0, directed=self.directed)
+        rev_graph.nodes = self.nodes
+        rev_graph.offsets, rev_graph.targets = self.rev_offsets, self.rev_targets
+        rev_graph.rev_offsets, rev_graph.rev_targets = self.offsets, self.targets
+        rev_graph.adj, rev_graph.rev = self.rev, self.adj
+        if not self.directed:
+            rev_graph.weights = self.weights
+        return rev_graph
+    # --------------------------------------------------------------------------}}}
+
+    def __getitem__(self, node):  # {{{
+        return self.targets[self.offsets[node]:self.offsets[node+1]]
+    # --------------------------------------------------------------------------}}}
+
+    def __len__(self):  # {{{
+        return len(self.nodes)
+    # --------------------------------------------------------------------------}}}
+
+    def __str__(self):  # {{{
+        ret = ""
+        for n in self.nodes:
+            neighbors = [str(i) for i in self[n]]
+            ret += str(n) + ": " + " ".join(neighbors) + "\n"
+        return ret[:-1]
+    # --------------------------------------------------------------------------}}}
+# ----------------------------------------------------------------------------}}}1
+
+
+# The binary graph file written by write_graph: a header, then the arrays of a
+# CSRGraph as little-endian int64 (offsets, targets, and for directed graphs
+# rev_offsets, rev_targets), then float64 weights aligned with targets if the
+# graph is weighted. open_graph maps the file and wraps the arrays in place.
+_GRAPH_MAGIC = b'CSRGRPH1'
+_GRAPH_HEADER = struct.Struct('<8sQQII')   # magic, nodes, entries, flags, 0
+_GRAPH_DIRECTED = 1
+_GRAPH_WEIGHTED = 2
+
+
+def _read_edge_text(path):  # {{{
+    # Parse a text edge list with lines "s t" or "s t w". Blank lines and lines
+    # starting with # are skipped. Returns an m x 2 or m x 3 array.
+    import numpy as np
+
+    f = open(path)
+    try:
+        text = f.read()
+    finally:
+        f.close()
+    if '#' in text:
+        text = '\n'.join(line for line in text.splitlines()
+                         if not line.lstrip().startswith('#'))
+    first_line = text.lstrip().split('\n', 1)[0]
+    columns = len(first_line.split()) if first_line else 2
+    if columns not in (2, 3):
+        raise ValueError("%s: expected 2 or 3 columns, not %d" % (path, columns))
+    values = np.fromstring(text, dtype=np.float64 if columns == 3 else np.int64,
+                           sep=' ')
+    if len(values) % columns != 0:
+        raise ValueError("%s: ragged edge list" % path)
+    return values.reshape(-1, columns)
+# ----------------------------------------------------------------------------}}}
+
+
+def _csr_from_keys(np, num_nodes, keys):  # {{{
+    # NumPy version of _csr_arrays, for sorted distinct int64 edge keys.
+    sources = keys // num_nodes
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=offsets[1:])
+    return offsets, keys % num_nodes
+# ----------------------------------------------------------------------------}}}
+
+
+def load_edges(source, num_nodes=None, directed=False):  # {{{
+    # Build a CSRGraph in bulk. source is the path of a text edge list (see
+    # _read_edge_text) or anything NumPy can turn into an m x 2 array of edges,
+    # or m x 3 with a weight in the last column. Nodes are numbered from 0 and
+    # num_nodes defaults to the largest node plus one. Edges are encoded as
+    # int64 keys s*num_nodes + t, then sorted and deduplicated with a single
+    # np.unique, so nothing runs a Python loop per edge. A duplicated edge keeps
+    # the weight it was first given; in an undirected graph (s,t) and (t,s) are
+    # the same edge, and both directions get that weight.
+    import numpy as np
+
+    if isinstance(source, str):
+        E = _read_edge_text(source)
+    else:
+        E = np.asarray(source)
+    if E.size == 0:
+        E = E.reshape(0, 2)
+    if E.ndim != 2 or E.shape[1] not in (2, 3):
+        raise ValueError("edges must be an m x 2 or m x 3 array")
+    s = E[:, 0].astype(np.int64)
+    t = E[:, 1].astype(np.int64)
+    weights = E[:, 2].astype(np.float64) if E.shape[1] == 3 else None
+    if num_nodes is None:
+        num_nodes = int(max(s.max(), t.max())) + 1 if len(s) else 0
+    if len(s) and (min(s.min(), t.min()) < 0 or
+                   max(s.max(), t.max()) >= num_nodes):
+        raise ValueError("node out of range(%d)" % num_nodes)
+
+    if not directed:
+        # dedupe on the orientation s <= t, then add the mirror image of every
+        # edge that is not a loop
+        lo, hi = np.minimum(s, t), np.maximum(s, t)
+        first = np.unique(lo*num_nodes + hi, return_index=True)[1]
+        s, t = lo[first], hi[first]
+        mirror = s != t
+        s, t = np.concatenate((s, t[mirror])), np.concatenate((t, s[mirror]))
+        if weights is not None:
+            weights = weights[first]
+            weights = np.concatenate((weights, weights[mirror]))
+    keys, first = np.unique(s*num_nodes + t, return_index=True)
+    if weights is not None:
+        weights = weights[first]
+    offsets, targets = _csr_from_keys(np, num_nodes, keys)
+    if not directed:
+        return CSRGraph.from_arrays(offsets, targets, weights=weights)
+
+    rev_keys = np.sort(targets*num_nodes + keys // num_nodes)
+    rev_offsets, rev_targets = _csr_from_keys(np, num_nodes, rev_keys)
+    return CSRGraph.from_arrays(offsets, targets, rev_offsets, rev_targets,
+                                directed=True, weights=weights)
+# ----------------------------------------------------------------------------}}}
+
+
+def write_graph(path, G):  # {{{
+    # Write G (a CSRGraph, or an AdjList, which is converted first) to path in
+    # the binary graph format.
+    import numpy as np
+
+    if not isinstance(G, CSRGraph):
+        G = CSRGraph.from_adjlist(G)
+    arrays = [G.offsets, G.targets]
+    if G.directed:
+        arrays += [G.rev_offsets, G.rev_targets]
+    arrays = [np.asarray(A, dtype='<i8') for A in arrays]
+    if G.weights is not None:
+        arrays.append(np.asarray(G.weights, dtype='<f8'))
+
+    flags = (_GRAPH_DIRECTED if G.directed else 0) | \
+        (_GRAPH_WEIGHTED if G.weights is not None else 0)
+    f = open(path, 'wb')
+    try:
+        f.write(_GRAPH_HEADER.pack(_GRAPH_MAGIC, len(G), len(G.targets),
+                                   flags, 0))
+        for A in arrays:
+            A.tofile(f)
+    finally:
+        f.close()
+# ----------------------------------------------------------------------------}}}
+
+
+def open_graph(path):  # {{{
+    # Map a file written by write_graph and return a read-only CSRGraph whose
+    # arrays point into the mapping, so opening costs the same for any size of
+    # graph and pages are shared between processes that open the same file.
+    import numpy as np
+
+    f = open(path, 'rb')
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        f.close()
+    magic, num_nodes, num_entries, flags, _ = _GRAPH_HEADER.unpack_from(mm, 0)
+    if magic != _GRAPH_MAGIC:
+        mm.close()
+        raise ValueError("%s is not a graph file" % path)
+    directed = bool(flags & _GRAPH_DIRECTED)
+    sizes = [num_nodes + 1, num_entries]
+    if directed:
+        sizes += [num_nodes + 1, num_entries]
+    expected = _GRAPH_HEADER.size + 8*sum(sizes)
+    if flags & _GRAPH_WEIGHTED:
+        expected += 8*num_entries
+    if len(mm) != expected:
+        mm.close()
+        raise ValueError("%s is truncated" % path)
+
+    arrays = []
+    pos = _GRAPH_HEADER.size
+    for size in sizes:
+        arrays.append(np.frombuffer(mm, dtype='<i8', count=size, offset=pos))
+        pos += 8*size
+    weights = None
+    if flags & _GRAPH_WEIGHTED:
+        weights = np.frombuffer(mm, dtype='<f8', count=num_entries, offset=pos)
+    if directed:
+        return CSRGraph.from_arrays(*arrays, directed=True, weights=weights)
+    return CSRGraph.from_arrays(*arrays, weights=weights)
+# ----------------------------------------------------------------------------}}}
+
+
+def bench_graph_file(num_nodes=10**5, num_edges=10**6, path='bench_graph.bin'):  # {{{
+    # Build the same random graph edge by edge and in bulk, then round-trip it
+    # through the binary graph file.
+    import numpy as np
+
+    edges = np.random.randint(0, num_nodes, size=(num_edges, 2))
+    edge_list = [tuple(e) for e in edges.tolist()]
+
+    start = time.time()
+    A = AdjList(num_nodes, edge_list[:num_edges//10], indexed=True)
+    print "AdjList (1/10 of the edges): %.3fs" % (time.time() - start)
+
+    start = time.time()
+    C = CSRGraph(num_nodes, edge_list)
+    print "CSRGraph:                    %.3fs" % (time.time() - start)
+
+    start = time.time()
+    G = load_edges(edges, num_nodes)
+    print "load_edges:                  %.3fs" % (time.time() - start)
+
+    start = time.time()
+    write_graph(path, G)
+    print "write_graph:                 %.3fs" % (time.time() - start)
+
+    start = time.time()
+    H = open_graph(path)
+    print "open_graph:                  %.6fs" % (time.time() - start)
+
+    assert np.array_equal(H.offsets, C.offsets)
+    assert np.array_equal(H.targets, C.targets)
+    del H
+
+    # an undirected edge given in both orientations gets one weight
+    G = load_edges(np.array([[0, 1, 5.0], [1, 0, 7.0], [2, 2, 1.0]]), 3)
+    assert G.weights.tolist() == [5.0, 5.0, 1.0]
+    os.remove(path)
+# ----------------------------------------------------------------------------}}}
+
+
 def BFS(G, s):  # {{{
     # Breadth First search for G and s. Returns a BFS tree rooted at s. The data
     # structure deque is used. It is something like a symmetric queue, with O(1)
@@ -140,6 +571,305 @@ def BFS(G, s):  # {{{
 # ----------------------------------------------------------------------------}}}
 
 
+def BFS_hybrid(G, s, alpha=14, beta=24):  # {{{
+    # Direction-optimizing BFS (Beamer, Asanovic and Patterson). Works on an
+    # AdjList or a CSRGraph and returns arrays parent, dist instead of a tree:
+    # parent[s] = s, parent[v] is the node v was discovered from, and both are
+    # -1 for nodes not reachable from s. dist is the same as BFS(G, s)[1].
+    #
+    # Each level is expanded either top-down (every frontier node scans its
+    # out-neighbors) or bottom-up (every unvisited node scans its in-neighbors,
+    # from G.rev, and stops at the first one in the frontier). Bottom-up wins
+    # in the big middle levels, where most edges out of the frontier lead to
+    # nodes already seen. The switch is Beamer's heuristic: go bottom-up once
+    # the frontier has more than 1/alpha of the unexplored edges, and back to
+    # top-down once it holds fewer than 1/beta of the nodes. The visited set and
+    # the frontier are byte-per-node flags (bytearray), not Python lists.
+    n = len(G)
+    rev = G.rev
+    if isinstance(G, CSRGraph):
+        offsets = G.offsets
+        out_degree = [offsets[u+1] - offsets[u] for u in G.nodes]
+    else:
+        out_degree = [len(G[u]) for u in G.nodes]
+    parent = array('l', [-1]) * n
+    dist = array('l', [-1]) * n
+    seen = bytearray(n)
+    parent[s] = s
+    dist[s] = 0
+    seen[s] = 1
+
+    frontier = [s]
+    unvisited = G.nodes
+    unexplored_edges = sum(out_degree) - out_degree[s]
+    bottom_up = False
+    level = 0
+    while frontier:
+        level += 1
+        frontier_edges = sum(out_degree[u] for u in frontier)
+        if not bottom_up and frontier_edges > unexplored_edges / alpha:
+            bottom_up = True
+        elif bottom_up and len(frontier) < n / beta:
+            bottom_up = False
+
+        next_frontier = []
+        if bottom_up:
+            in_frontier = bytearray(n)
+            for u in frontier:
+                in_frontier[u] = 1
+            unvisited = [v for v in unvisited if not seen[v]]
+            for v in unvisited:
+                for u in rev[v]:
+                    if in_frontier[u]:
+                        seen[v] = 1
+                        parent[v] = u
+                        dist[v] = level
+                        next_frontier.append(v)
+                        break
+        else:
+            for u in frontier:
+                for v in G[u]:
+                    if not seen[v]:
+                        seen[v] = 1
+                        parent[v] = u
+                        dist[v] = level
+                        next_frontier.append(v)
+
+        unexplored_edges -= sum(out_degree[v] for v in next_frontier)
+        frontier = next_frontier
+
+    return parent, dist
+# ----------------------------------------------------------------------------}}}
+
+
+def bench_BFS_hybrid(num_nodes=10**5, avg_degree=16):  # {{{
+    # Compare BFS and BFS_hybrid on randgraph(num_nodes) and on a denser random
+    # CSRGraph with about avg_degree neighbors per node.
+    graphs = [("randgraph", randgraph(num_nodes))]
+    edges = [(randrange(num_nodes), randrange(num_nodes))
+             for _ in xrange(num_nodes*avg_degree//2)]
+    graphs.append(("degree %d" % avg_degree, CSRGraph(num_nodes, edges)))
+
+    for name, G in graphs:
+        start = time.time()
+        dist = BFS(G, 0)[1]
+        plain = time.time() - start
+
+        start = time.time()
+        hybrid_dist = BFS_hybrid(G, 0)[1]
+        hybrid = time.time() - start
+
+        assert list(hybrid_dist) == dist
+        print "%-10s BFS: %.3fs  BFS_hybrid: %.3fs" % (name, plain, hybrid)
+# ----------------------------------------------------------------------------}}}
+
+
+# The number of roots BFS_multi runs at once: one bit per root in a machine
+# word per node, so as many as an array('L') item has bits (64 on most 64-bit
+# Unix builds, 32 on Windows and 32-bit builds).
+MSBFS_WIDTH = 8 * array('L').itemsize
+
+
+def BFS_multi(G, sources):  # {{{
+    # Multi-source BFS (MS-BFS, Then et al.): the distances from up to
+    # MSBFS_WIDTH roots in one traversal. Bit i of seen[v] says that root
+    # sources[i] has reached v, and bit i of visit[v] that v is in the frontier
+    # of root i. A level ORs the visit word of each frontier node into its
+    # neighbors, so one scan of an edge serves every root whose frontier holds
+    # its tail, and nodes reached by many roots at the same level are expanded
+    # once. Returns a list of len(sources) arrays, the i-th one equal to
+    # BFS(G, sources[i])[1].
+    if len(sources) > MSBFS_WIDTH:
+        raise ValueError("at most %d sources at once" % MSBFS_WIDTH)
+    n = len(G)
+    seen = array('L', [0]) * n
+    visit = array('L', [0]) * n
+    visit_next = array('L', [0]) * n
+    dist = [array('l', [-1]) * n for _ in sources]
+    for i, s in enumerate(sources):
+        seen[s] |= 1 << i
+        visit[s] |= 1 << i
+        dist[i][s] = 0
+
+    frontier = sorted(set(sources))
+    level = 0
+    while frontier:
+        level += 1
+        reached = []
+        for u in frontier:
+            bits = visit[u]
+            visit[u] = 0
+            for v in G[u]:
+                new = bits & ~seen[v]
+                if new:
+                    if not visit_next[v]:
+                        reached.append(v)
+                    visit_next[v] |= new
+
+        for v in reached:
+            new = visit_next[v]
+            visit_next[v] = 0
+            seen[v] |= new
+            visit[v] = new
+            while new:
+                low = new & -new
+                dist[low.bit_length() - 1][v] = level
+                new ^= low
+        frontier = reached
+
+    return dist
+# ----------------------------------------------------------------------------}}}
+
+
+def BFS_matrix(G, sources=None, out=None):  # {{{
+    # Distances from every node in sources (default: all of G.nodes), computed
+    # MSBFS_WIDTH roots at a time with BFS_multi. Row i of the result holds the
+    # distances from sources[i], with -1 for unreachable nodes. out may be a
+    # preallocated NumPy array of shape (len(sources), len(G)), for example a
+    # np.memmap, and is filled in place; otherwise an int64 array is made.
+    import numpy as np
+
+    if sources is None:
+        sources = G.nodes
+    sources = list(sources)
+    if out is None:
+        out = np.empty((len(sources), len(G)), dtype=np.int64)
+    elif out.shape != (len(sources), len(G)):
+        raise ValueError("out must have shape (%d, %d)" % (len(sources), len(G)))
+
+    for lo in xrange(0, len(sources), MSBFS_WIDTH):
+        batch = sources[lo:lo + MSBFS_WIDTH]
+        for i, row in enumerate(BFS_multi(G, batch)):
+            out[lo + i] = np.frombuffer(row, dtype=np.int_)
+    return out
+# ----------------------------------------------------------------------------}}}
+
+
+def bench_BFS_multi(num_nodes=10**4, avg_degree=8, num_sources=MSBFS_WIDTH):  # {{{
+    # Distances from num_sources roots of a random CSRGraph, with one BFS per
+    # root and with BFS_multi.
+    edges = [(randrange(num_nodes), randrange(num_nodes))
+             for _ in xrange(num_nodes*avg_degree//2)]
+    G = CSRGraph(num_nodes, edges)
+    sources = [randrange(num_nodes) for _ in xrange(num_sources)]
+
+    start = time.time()
+    single = [BFS(G, s)[1] for s in sources]
+    print "BFS per root: %.3fs" % (time.time() - start)
+
+    start = time.time()
+    multi = BFS_multi(G, sources)
+    print "BFS_multi:    %.3fs" % (time.time() - start)
+
+    assert [list(d) for d in multi] == single
+# ----------------------------------------------------------------------------}}}
+
+
+_bfs_graph = _bfs_dist = None
+
+
+def _init_bfs_worker(path, dist):  # {{{
+    # Each worker maps the graph file itself, so no graph data is pickled, and
+    # wraps the shared dist array without copying it.
+    import numpy as np
+
+    global _bfs_graph, _bfs_dist
+    _bfs_graph = open_graph(path)
+    _bfs_dist = np.ctypeslib.as_array(dist)
+# ----------------------------------------------------------------------------}}}
+
+
+def _bfs_level(job):  # {{{
+    # Expand one chunk of the frontier: gather the neighbors of its nodes with
+    # one fancy index into targets, set dist = level for those not seen yet and
+    # return them. Two workers may both claim a node; they write the same
+    # level, and BFS_parallel removes the duplicate from the next frontier.
+    import numpy as np
+
+    chunk, level = job
+    offsets, targets = _bfs_graph.offsets, _bfs_graph.targets
+    starts = offsets[chunk]
+    counts = offsets[chunk + 1] - starts
+    shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    neighbors = targets[np.arange(counts.sum()) + shift]
+    new = np.unique(neighbors[_bfs_dist[neighbors] == -1])
+    _bfs_dist[new] = level
+    return new
+# ----------------------------------------------------------------------------}}}
+
+
+def BFS_parallel(path, s, processes=None, chunks_per_process=4):  # {{{
+    # Level-synchronous BFS from s on a graph file written by write_graph. Each
+    # frontier is split into chunks that a pool of processes expands at the
+    # same time (see _bfs_level), and pool.map is the barrier between levels.
+    # dist lives in a shared RawArray and the graph is mapped from the file in
+    # every worker, so only frontier chunks travel between processes. Returns
+    # dist as a NumPy array, equal to BFS(open_graph(path), s)[1].
+    import numpy as np
+
+    if processes is None:
+        processes = cpu_count()
+    f = open(path, 'rb')
+    try:
+        magic, num_nodes = _GRAPH_HEADER.unpack(f.read(_GRAPH_HEADER.size))[:2]
+    finally:
+        f.close()
+    if magic != _GRAPH_MAGIC:
+        raise ValueError("%s is not a graph file" % path)
+    shared_dist = RawArray('l', num_nodes)
+    dist = np.ctypeslib.as_array(shared_dist)
+    dist[:] = -1
+    dist[s] = 0
+
+    pool = Pool(processes, _init_bfs_worker, (path, shared_dist))
+    try:
+        frontier = np.array([s], dtype=np.int64)
+        level = 0
+        while len(frontier):
+            level += 1
+            chunks = np.array_split(frontier,
+                                    min(len(frontier), chunks_per_process*processes))
+            found = pool.map(_bfs_level, [(chunk, level) for chunk in chunks])
+            frontier = np.unique(np.concatenate(found))
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return dist.copy()
+# ----------------------------------------------------------------------------}}}
+
+
+def bench_BFS_parallel(num_nodes=10**6, avg_degree=8, max_processes=None,
+                       path='bench_graph.bin'):  # {{{
+    # Serial BFS against BFS_parallel with 1 to max_processes workers on a
+    # random graph file.
+    import numpy as np
+
+    if max_processes is None:
+        max_processes = cpu_count()
+    edges = np.random.randint(0, num_nodes, size=(num_nodes*avg_degree//2, 2))
+    write_graph(path, load_edges(edges, num_nodes))
+    H = open_graph(path)
+    G = CSRGraph.from_arrays(array('l', H.offsets.tolist()),
+                             array('l', H.targets.tolist()))
+    del H
+
+    start = time.time()
+    dist = BFS(G, 0)[1]
+    serial = time.time() - start
+    print "BFS:                      %.3fs" % serial
+
+    for processes in xrange(1, max_processes + 1):
+        start = time.time()
+        parallel_dist = BFS_parallel(path, 0, processes)
+        elapsed = time.time() - start
+        assert parallel_dist.tolist() == dist
+        print "BFS_parallel, %2d workers: %.3fs (%.1fx)" % (
+            processes, elapsed, serial / elapsed)
+    os.remove(path)
+# ----------------------------------------------------------------------------}}}
+
+
 def predecessors(BFS_Tree, u, stop_at=None):  # {{{
     # Return an array of predecessors of u in the BFS tree. The last element will
     # be the root, and the first will be u. If stop_at is specified, then stop at
@@ -231,7 +961,7 @@ def randgraph(num_nodes):  # {{{
     phi = (1 + 5**0.5)/2
     num_edges = int(num_nodes*phi)
 
-    G = AdjList(num_nodes)
+    G = AdjList(num_nodes, indexed=True)
     for _ in xrange(num_edges):
         new_edge = (randrange(num_nodes), randrange(num_nodes))
         if not G.has_edge(*new_edge):
@@ -241,6 +971,19 @@ def randgraph(num_nodes):  # {{{
 # ----------------------------------------------------------------------------}}}
 
 
+# compare building a large graph edge by edge, in bulk, and from a graph file
+#bench_graph_file()
+
+# compare BFS with the direction-optimizing BFS_hybrid
+#bench_BFS_hybrid()
+
+# compare one BFS per root with the bit-parallel BFS_multi
+#bench_BFS_multi()
+
+# speedup of the process-parallel BFS_parallel over BFS
+#bench_BFS_parallel()
+
+
 # You can check your findCycle implementation by running this several times and
 # checking the output:
 A = randgraph(randrange(25))
@@ -1,5 +1,7 @@
 # imports {{{1
 from __future__ import division
+from array import array
+from bisect import bisect_left
 from collections import deque
 from copy import deepcopy
 from itertools import *
@@ -15,6 +17,7 @@ class AdjList: # {{{1
   # AdjList.adj is the actual adjacency list.
   # AdjList.rev is the adjacency list of the reverse graph
   # AdjList.directed is a bool indicating whether the graph is directed.
+  # AdjList.index is None, or a list of neighbor sets (see build_index).
   # AdjList.nodes is an array of the form range(n).
 
   # Edges may be specified on initialization or with the add_edge method.
@@ -26,11 +29,14 @@ class AdjList: # {{{1
   #     explicity or implicityly convert A to a string (like with print).
   # These correspond to the last 3 class methods.
 
-  def __init__(self, num_nodes, edges = [], directed = False): # {{{
+  def __init__(self, num_nodes, edges = [], directed = False, indexed = False): # {{{
     self.nodes = range(num_nodes)
     self.adj = [ [] for _ in self.nodes ]
     self.rev = [ [] for _ in self.nodes ]
     self.directed = directed
+    self.index = None
+    if indexed:
+      self.build_index()
 
     for (s,t) in edges:
       self.add_edge(s,t)
@@ -40,9 +46,11 @@ class AdjList: # {{{1
 
   def add_edge(self, s, t, try_directed = True): # {{{
   # Adds an edge (s,t). If the graph is undirected, it adds edge (t,s) as well.
-    if t not in self.adj[s]:
+    if not self.has_edge(s, t):
       self.adj[s].append(t)
       self.rev[t].append(s)
+      if self.index is not None:
+        self.index[s].add(t)
 
     if not self.directed and try_directed:
       self.add_edge(t, s, try_directed = False)
@@ -55,6 +63,8 @@ class AdjList: # {{{1
       del self.adj[s][t_index]
       s_index = self.rev[t].index(s)
       del self.rev[t][s_index]
+      if self.index is not None:
+        self.index[s].discard(t)
     except ValueError:
       pass
 
@@ -63,11 +73,25 @@ class AdjList: # {{{1
   #--------------------------------------------------------------------------}}}
 
   def has_edge(self, s, t): # {{{
+    if self.index is not None:
+      return t in self.index[s]
     return t in self.adj[s]
   #--------------------------------------------------------------------------}}}
   def has_edge_rev(self, s, t): # {{{
+    if self.index is not None:
+      return s in self.index[t]
     return t in self.rev[s]
   #--------------------------------------------------------------------------}}}
+  def build_index(self): # {{{
+    # Keep a set of out-neighbors next to each adjacency list, so has_edge
+    # and the duplicate check in add_edge are O(1) instead of a scan of
+    # adj[s]. add_edge and del_edge keep it in sync; edits made directly to
+    # adj need a fresh build_index().
+    self.index = [ set(neighbors) for neighbors in self.adj ]
+  #--------------------------------------------------------------------------}}}
+  def drop_index(self): # {{{
+    self.index = None
+  #--------------------------------------------------------------------------}}}
   def is_path(self, path): # {{{
     if not path:    # if path is [] or None
       return False
@@ -110,6 +134,9 @@ class AdjList: # {{{1
     rev_adjlist.adj = deepcopy(self.rev)
     rev_adjlist.rev = deepcopy(self.adj)
 
+    if self.index is not None:
+      rev_adjlist.build_index()
+
     return rev_adjlist
   #--------------------------------------------------------------------------}}}
 
@@ -128,11 +155,176 @@ class AdjList: # {{{1
   #--------------------------------------------------------------------------}}}
 #----------------------------------------------------------------------------}}}1
 
+class _CSRRows: # {{{1
+  # The rows of a compressed sparse row structure: row u is
+  # targets[offsets[u]:offsets[u+1]]. Used for CSRGraph.adj and CSRGraph.rev.
+
+  def __init__(self, offsets, targets): # {{{
+    self.offsets = offsets
+    self.targets = targets
+  #--------------------------------------------------------------------------}}}
+
+  def __getitem__(self, node): # {{{
+    return self.targets[self.offsets[node]:self.offsets[node+1]]
+  #--------------------------------------------------------------------------}}}
+
+  def __len__(self): # {{{
+    return len(self.offsets) - 1
+  #--------------------------------------------------------------------------}}}
+
+  def __iter__(self): # {{{
+    for node in xrange(len(self)):
+      yield self[node]
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
+def _csr_arrays(num_nodes, keys): # {{{
+  # keys is a sorted list of distinct edge keys s*num_nodes + t. Return the
+  # arrays offsets, targets of the CSR structure.
+  offsets = array('l', [0]) * (num_nodes + 1)
+  targets = array('l', [0]) * len(keys)
+  for i, key in enumerate(keys):
+    s, targets[i] = divmod(key, num_nodes)
+    offsets[s+1] += 1
+  for u in xrange(num_nodes):
+    offsets[u+1] += offsets[u]
+  return offsets, targets
+#----------------------------------------------------------------------------}}}
+
+class CSRGraph: # {{{1
+  # An immutable graph in compressed sparse row form, for graphs too big for
+  # AdjList. The out-neighbours of u are CSRGraph.targets[offsets[u]:
+  # offsets[u+1]], sorted, and the reverse graph is stored the same way in
+  # CSRGraph.rev_offsets and CSRGraph.rev_targets. All four are flat arrays,
+  # built in one pass over the edge list: the edges are encoded as integers
+  # s*num_nodes + t, deduplicated and sorted together, and counted into rows.
+  #
+  # CSRGraph has the read-only interface of AdjList, so functions written
+  # for AdjList run on it unchanged:
+  #   - G[u] (or G.adj[u]) is the sorted adjacency list of u, and G.rev[u]
+  #     the one of the reverse graph
+  #   - len(G) is the number of nodes and G.nodes is range(len(G))
+  #   - G.has_edge(s, t) is a binary search, O(log deg)
+  #   - G.in_degree(s), G.out_degree(s) and G.degree(s) are O(1)
+  # CSRGraph.from_adjlist(A) converts an AdjList.
+
+  def __init__(self, num_nodes, edges = [], directed = False): # {{{
+    self.nodes = xrange(num_nodes)
+    self.directed = directed
+
+    keys = set()
+    for (s, t) in edges:
+      keys.add(s*num_nodes + t)
+      if not directed:
+        keys.add(t*num_nodes + s)
+    keys = sorted(keys)
+    self.offsets, self.targets = _csr_arrays(num_nodes, keys)
+    if directed:
+      keys = sorted((key % num_nodes)*num_nodes + key // num_nodes
+             for key in keys)
+      self.rev_offsets, self.rev_targets = _csr_arrays(num_nodes, keys)
+    else:
+      self.rev_offsets, self.rev_targets = self.offsets, self.targets
+    del keys
+
+    self.adj = _CSRRows(self.offsets, self.targets)
+    self.rev = _CSRRows(self.rev_offsets, self.rev_targets)
+  #--------------------------------------------------------------------------}}}
+
+  @classmethod
+  def from_adjlist(cls, A): # {{{
+    edges = ((s, t) for s in A.nodes for t in A.adj[s])
+    return cls(len(A), edges, directed=A.directed)
+  #--------------------------------------------------------------------------}}}
+
+  def num_edges(self): # {{{
+    # number of entries in the adjacency lists; an undirected edge counts
+    # twice, as in AdjList
+    return len(self.targets)
+  #--------------------------------------------------------------------------}}}
+
+  def has_edge(self, s, t): # {{{
+    hi = self.offsets[s+1]
+    i = bisect_left(self.targets, t, self.offsets[s], hi)
+    return i < hi and self.targets[i] == t
+  #--------------------------------------------------------------------------}}}
+
+  def has_edge_rev(self, s, t): # {{{
+    hi = self.rev_offsets[s+1]
+    i = bisect_left(self.rev_targets, t, self.rev_offsets[s], hi)
+    return i < hi and self.rev_targets[i] == t
+  #--------------------------------------------------------------------------}}}
+
+  def is_path(self, path): # {{{
+    if not path:    # if path is [] or None
+      return False
+
+    for i in range(1, len(path)):
+      if not self.has_edge(path[i-1], path[i]):
+        return False
+    return True
+  #--------------------------------------------------------------------------}}}
+
+  def is_cycle(self, path): # {{{
+    # in an undirected graph 1-cycles don't count
+    if not self.directed and len(path) == 2:
+      return False
+
+    return self.is_path(list(path) + [path[0]])
+  #--------------------------------------------------------------------------}}}
+
+  def in_degree(self, s): # {{{
+    return self.rev_offsets[s+1] - self.rev_offsets[s]
+  #--------------------------------------------------------------------------}}}
+
+  def out_degree(self, s): # {{{
+    return self.offsets[s+1] - self.offsets[s]
+  #--------------------------------------------------------------------------}}}
+
+  def degree(self, s): # {{{
+    if not self.directed:
+      return self.out_degree(s)
+
+    return self.out_degree(s) + self.in_degree(s)
+  #--------------------------------------------------------------------------}}}
+
+  def sort(self): # {{{
+    # the rows are always sorted
+    pass
+  #--------------------------------------------------------------------------}}}
+
+  def reverse(self): # {{{
+    # returns reverse graph, sharing the arrays of this one
+    rev_graph = CSRGraph(0, directed=self.directed)
+    rev_graph.nodes = self.nodes
+    rev_graph.offsets, rev_graph.targets = self.rev_offsets, self.rev_targets
+    rev_graph.rev_offsets, rev_graph.rev_targets = self.offsets, self.targets
+    rev_graph.adj, rev_graph.rev = self.rev, self.adj
+    return rev_graph
+  #--------------------------------------------------------------------------}}}
+
+  def __getitem__(self, node): # {{{
+    return self.targets[self.offsets[node]:self.offsets[node+1]]
+  #--------------------------------------------------------------------------}}}
+
+  def __len__(self): # {{{
+    return len(self.nodes)
+  #--------------------------------------------------------------------------}}}
+
+  def __str__(self): # {{{
+    ret = ""
+    for n in self.nodes:
+      neighbors = [str(i) for i in self[n]]
+      ret += str(n) + ": " + " ".join(neighbors) + "\n"
+    return ret[:-1]
+  #--------------------------------------------------------------------------}}}
+#----------------------------------------------------------------------------}}}1
+
 def randgraph(num_nodes, directed=False):  # {{{
   phi = (1 + 5**0.5)/2
   num_edges = int( num_nodes*phi )
 
-  G = AdjList(num_nodes, directed=directed)
+  G = AdjList(num_nodes, directed=directed, indexed=True)
   for _ in xrange(num_edges):
     new_edge = (randrange(num_nodes), randrange(num_nodes))
     G.add_edge( *new_edge )